@@ -17,6 +17,7 @@ in
     ./autoStart.nix
     ./menuConfig.nix
     ./offlineCapable.nix
+    ./serveStore.nix
   ];
 
   options.programs.disko-install-menu = {
@@ -8,18 +8,70 @@
 let
   cfg = config.programs.disko-install-menu;
 
-  inherit (builtins) attrValues filter mapAttrs;
+  inherit (builtins)
+    attrValues
+    filter
+    head
+    length
+    mapAttrs
+    removeAttrs
+    ;
   inherit (lib) types;
-  inherit (lib.attrsets) filterAttrs genAttrs;
-  inherit (lib.lists) singleton;
-  inherit (lib.modules) mkIf;
+  inherit (lib.attrsets)
+    filterAttrs
+    genAttrs
+    mapAttrsToList
+    zipAttrs
+    ;
+  inherit (lib.lists) flatten singleton unique;
+  inherit (lib.modules) mkIf mkRemovedOptionModule;
   inherit (lib.options) mkEnableOption mkOption;
+  inherit (lib.strings) toLower;
   inherit (lib.trivial) flip pipe;
 
   mkDisableOption = text: mkEnableOption text // { default = true; };
 
   cfgFormat = pkgs.formats.json { };
 
+  hostMatchKinds = {
+    # option name -> key prefix in hostMatchIndex (ordered by specificity in setup.py)
+    boardSerials = "board_serial";
+    diskSerials = "disk_serial";
+    macAddresses = "mac";
+    productSerials = "product_serial";
+    productUuids = "product_uuid";
+  };
+  hostMatchType = types.submodule {
+    options = {
+      boardSerials = mkOption {
+        description = "Mainboard serial numbers, as in {file}`/sys/class/dmi/id/board_serial`.";
+        type = with types; listOf str;
+        default = [ ];
+      };
+      diskSerials = mkOption {
+        description = "Disk serial numbers, as listed by `lsblk --output SERIAL`.";
+        type = with types; listOf str;
+        default = [ ];
+      };
+      macAddresses = mkOption {
+        description = "MAC addresses of network interfaces, as in {file}`/sys/class/net/*/address`.";
+        type = with types; listOf str;
+        default = [ ];
+        example = singleton "52:54:00:12:34:56";
+      };
+      productSerials = mkOption {
+        description = "System serial numbers, as in {file}`/sys/class/dmi/id/product_serial`.";
+        type = with types; listOf str;
+        default = [ ];
+      };
+      productUuids = mkOption {
+        description = "System UUIDs, as in {file}`/sys/class/dmi/id/product_uuid`.";
+        type = with types; listOf str;
+        default = [ ];
+      };
+    };
+  };
+
   attrNamesToTrue = with types; coercedTo (listOf str) (flip genAttrs (_: true)) (attrsOf bool);
   flakesType = types.submodule (
     { name, ... }:
@@ -59,6 +111,24 @@ let
           default = { };
           example = singleton "test-x86_64-linux";
         };
+        hostMatches = mkOption {
+          description = ''
+            Hardware identifiers of the machines each configuration is intended for.
+
+            - configurations are referred to by their name in the attrset `nixosConfigurations`
+            - if any identifier matches the machine the menu runs on,
+              that configuration is offered first in the install menu
+            - each identifier may only refer to a single configuration
+
+            These are compiled into an index when building the installer,
+            so matching requires no evaluation on runtime.
+          '';
+          type = types.attrsOf hostMatchType;
+          default = { };
+          example = {
+            "server-01".macAddresses = singleton "52:54:00:12:34:56";
+          };
+        };
       };
     }
   );
@@ -69,6 +139,14 @@ let
     })) (attrsOf flakesType);
 
   menuOptions = types.submodule {
+    imports = [
+      # its assertion is forwarded to the NixOS assertions
+      (mkRemovedOptionModule [ "diskoInstallFlags" ] ''
+        disko-install is no longer used, as the installation is executed in resumable stages.
+        Use programs.disko-install-menu.options.nixosInstallFlags for flags of nixos-install instead,
+        flags specific to disko-install (like --extra-files) have no replacement.
+      '')
+    ];
     freeformType = cfgFormat.type;
     options = {
 
@@ -85,6 +163,16 @@ let
         example = false;
       };
 
+      copyJobs = mkOption {
+        description = ''
+          How many batches of store paths are copied in parallel
+          into the store of the system being installed.
+        '';
+        type = types.ints.positive;
+        default = 4;
+        example = 8;
+      };
+
       debugMode = mkEnableOption "debug (i.e. dry-run) mode, where no changes will be applied by the install menu";
 
       defaultFlake = mkOption {
@@ -121,10 +209,75 @@ let
         example = "empty";
       };
 
-      diskoInstallFlags = mkOption {
-        description = "Command line arguments which are forwarded to disko-install.";
+      discardDisks = mkEnableOption ''
+        discarding all blocks of the selected disks before formatting them (via `blkdiscard`).
+
+        This speeds up later writes on SSDs & NVMe drives.
+        Disks not supporting discard are skipped.
+        Users can still toggle this before confirming an installation
+      ''; # mkEnableOption -> dot at end is added
+
+      diskBenchmark = mkEnableOption ''
+        a short, read-only benchmark of each disk shown in the disk selection,
+        executed in the background.
+
+        Its results (sequential throughput & random read IOPS)
+        are shown in the preview of each disk
+      ''; # mkEnableOption -> dot at end is added
+
+      evalJobs = mkOption {
+        description = ''
+          How many host configurations are evaluated in parallel
+          when collecting the previews of a flake’s hosts.
+        '';
+        type = types.ints.positive;
+        default = 4;
+        example = 8;
+      };
+
+      evalTimeout = mkOption {
+        description = ''
+          Seconds after which evaluating the preview of a single host configuration is aborted.
+          Such hosts are still listed, with the timeout as their preview.
+        '';
+        type = types.ints.positive;
+        default = 120;
+        example = 30;
+      };
+
+      extraSubstituters = mkOption {
+        description = ''
+          Additional binary caches used when building the configuration to install,
+          e.g. a cache in the local network
+          or another installer serving its store
+          (see {option}`programs.disko-install-menu.serveStore.enable`).
+        '';
+        type = with types; listOf str;
+        default = [ ];
+        example = singleton "http://installer-01.lan:5000";
+      };
+
+      extraTrustedPublicKeys = mkOption {
+        description = ''
+          Additional public keys trusted for store paths
+          downloaded from {option}`programs.disko-install-menu.options.extraSubstituters`.
+        '';
         type = with types; listOf str;
         default = [ ];
+        example = singleton "installer-01:AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA=";
+      };
+
+      hostMatchIndex = mkOption {
+        description = ''
+          Maps hardware identifiers (as `<kind>:<lowercase value>`)
+          to the flake entry title & host name of the configuration to offer first.
+
+          This option is used internally.
+          Prefer {option}`programs.disko-install-menu.listedFlakes.*.hostMatches`.
+        '';
+        internal = true;
+        type = with types; attrsOf (attrsOf str);
+        default = { };
       };
 
       listedFlakes = mkOption {
@@ -146,6 +299,88 @@ let
         ];
       };
 
+      lowBandwidth = mkOption {
+        description = ''
+          Whether to render the menu for low-bandwidth terminals,
+          e.g. serial consoles or IPMI serial-over-LAN.
+
+          This omits borders & colors
+          and only shows previews on demand (toggled with `CTRL+/`),
+          so less data is sent to the terminal on each keystroke.
+
+          The default value `null` enables this automatically
+          when running on a serial console with at most 115200 baud.
+        '';
+        type = types.enum [
+          false
+          null
+          true
+        ];
+        default = null;
+      };
+
+      nixosInstallFlags = mkOption {
+        description = ''
+          Command line arguments which are forwarded to nixos-install
+          when the bootloader is installed.
+        '';
+        type = with types; listOf str;
+        default = [ ];
+        example = [
+          "--option"
+          "sandbox"
+          "false"
+        ];
+      };
+
+      serveStorePort = mkOption {
+        description = ''
+          Port of the binary cache serving this installer's store,
+          `null` if disabled.
+
+          This option is used internally.
+          Prefer {option}`programs.disko-install-menu.serveStore.enable`.
+        '';
+        internal = true;
+        type = with types; nullOr port;
+        default = null;
+      };
+
+      sessionSnapshot = mkOption {
+        description = ''
+          Path where the menu snapshots its session,
+          i.e. host lists, evaluated previews & the last selected plan,
+          so a restarted menu can continue without evaluating again.
+
+          The default value `null` stores it below {file}`/run`,
+          which survives restarts of the menu, but not reboots.
+          Set this to a path on writable media to keep it across reboots,
+          e.g. after rebooting into the firmware setup.
+        '';
+        type = with types; nullOr str;
+        default = null;
+        example = "/media/installer-data/session.json";
+      };
+
+      statusCollector = mkOption {
+        description = ''
+          Where to report the progress of this installer to,
+          i.e. the menu shown, the running stage, build progress & errors,
+          so a fleet of machines installed at once can be watched from one place.
+
+          Supports `udp://HOST:PORT` & `http(s)://HOST:PORT/PATH`,
+          events are sent as batched JSON in the background
+          and dropped if the collector is unreachable.
+          A minimal collector showing a table of all installers is bundled:
+          run `disko-install-menu --status-aggregator udp://0.0.0.0:9999`.
+
+          The default value `null` disables reporting.
+        '';
+        type = with types; nullOr str;
+        default = null;
+        example = "udp://10.0.0.1:9999";
+      };
+
       writeEfiBootEntries = mkOption {
         description = ''
           Whether to enable writing EFI boot entries on installation.
@@ -175,6 +410,34 @@ let
 
     };
   };
+
+  hostMatchEntries = flatten (
+    flip mapAttrsToList (filterAttrs (_: v: v.enabled) cfg.listedFlakes) (
+      _: flake:
+      flip mapAttrsToList flake.hostMatches (
+        host: spec:
+        flip mapAttrsToList hostMatchKinds (
+          option: kind:
+          map (value: {
+            "${kind}:${toLower value}" = {
+              inherit host;
+              inherit (flake) title;
+            };
+          }) spec.${option}
+        )
+      )
+    )
+  );
+  hostMatchIndex = flip mapAttrs (zipAttrs hostMatchEntries) (
+    key: matches:
+    let
+      uniqueMatches = unique matches;
+    in
+    if length uniqueMatches == 1 then
+      head uniqueMatches
+    else
+      throw "disko-install-menu: hardware identifier ${key} matches multiple hosts"
+  );
 in
 {
 
@@ -208,9 +471,18 @@ in
   };
 
   config = mkIf cfg.enable {
+    # defined by removed options, see menuOptions
+    assertions = cfg.options.assertions or [ ];
+
     # moved to /etc so config applies when disko-install-menu is just called by itself
     environment.etc."disko-install-menu/config".source =
-      cfgFormat.generate "disko-install-menu-config" cfg.options;
+      cfgFormat.generate "disko-install-menu-config" (
+        # removed options throw on access
+        removeAttrs cfg.options [
+          "assertions"
+          "diskoInstallFlags"
+        ]
+      );
 
     programs.disko-install-menu = {
 
@@ -222,6 +494,7 @@ in
 
       # options translation
       options = {
+        inherit hostMatchIndex;
         listedFlakes = pipe cfg.listedFlakes [
           (filterAttrs (_: v: v.enabled))
           (mapAttrs (
@@ -0,0 +1,65 @@
+# type: NixOS module
+{
+  config,
+  lib,
+  ...
+}:
+let
+  cfg = config.programs.disko-install-menu;
+
+  inherit (lib) types;
+  inherit (lib.modules) mkForce mkIf;
+  inherit (lib.options) mkEnableOption mkOption;
+in
+{
+
+  options.programs.disko-install-menu.serveStore = {
+
+    enable = mkEnableOption ''
+      serving the Nix store of this installer as binary cache to other installers,
+      started on demand from the menu.
+
+      When installing many machines from the same flake,
+      other installers can list this one in
+      {option}`programs.disko-install-menu.options.extraSubstituters`,
+      so store paths are downloaded only once from upstream
+    ''; # mkEnableOption -> dot at end is added
+
+    port = mkOption {
+      description = "Port the binary cache listens on.";
+      type = types.port;
+      default = 5000;
+    };
+
+    secretKeyFile = mkOption {
+      description = ''
+        Path to the secret key used for signing the served store paths,
+        e.g. generated with `nix-store --generate-binary-cache-key`.
+
+        Its public key must be listed in
+        {option}`programs.disko-install-menu.options.extraTrustedPublicKeys`
+        of the other installers.
+      '';
+      type = with types; nullOr str;
+      default = null;
+      example = "/run/keys/installer-cache.sec";
+    };
+
+  };
+
+  config = mkIf (cfg.enable && cfg.serveStore.enable) {
+
+    programs.disko-install-menu.options.serveStorePort = cfg.serveStore.port;
+
+    services.nix-serve = {
+      enable = true;
+      inherit (cfg.serveStore) port secretKeyFile;
+      openFirewall = true;
+    };
+
+    # only started on demand from the menu
+    systemd.services.nix-serve.wantedBy = mkForce [ ];
+
+  };
+
+}
@@ -8,8 +8,8 @@
   disko,
   fzf,
   nix,
+  nixos-install-tools,
   nixos-rebuild,
-  nix-output-monitor,
   python3Minimal,
   smartmontools,
   util-linux,
@@ -32,16 +32,17 @@ replaceVarsWith {
     runtimePython = getExe python3Minimal;
     path = makeBinPath [
       bash
-      disko # for disko-install
+      disko # for manual repairs in shell
       fzf
       nix
+      nixos-install-tools # for nixos-install, nixos-enter
       nixos-rebuild
-      nix-output-monitor
       python3Minimal
       smartmontools # for smartctl
       util-linux # for lsblk, fdisk
     ];
     hostPreviewNix = "${./support/host-preview.nix}";
+    installPlanNix = "${./support/install-plan.nix}";
   };
 
   nativeBuildInputs = [ installShellFiles ];
@@ -3,12 +3,18 @@
 from __future__ import annotations
 
 import argparse
+from collections import deque
 from collections.abc import (
     Iterator,
     Iterable,
     Mapping,
     Sequence,
 )
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor,
+    as_completed,
+)
 from contextlib import contextmanager
 from dataclasses import (
     dataclass,
@@ -16,26 +22,44 @@ from dataclasses import (
 )
 from enum import (
     Enum,
+    IntEnum,
     auto,
 )
 from functools import (
     cached_property,
+    partial,
+)
+from graphlib import TopologicalSorter
+import hashlib
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
 )
+from itertools import takewhile
 import json
+import mmap
 from multiprocessing.connection import (
     Client,
+    Connection,
     Listener,
 )
 import os
 from pathlib import Path
 import random
+import re
 import shlex
+import shutil
+import socket
 import subprocess
 import sys
+import termios
 from threading import (
+    Lock,
     Thread,
 )
 import time
+import urllib.parse
+import urllib.request
 from typing import (
     Any,
     Callable,
@@ -59,6 +83,10 @@ HOST_PREVIEW_NIX = "@hostPreviewNix@"
 if HOST_PREVIEW_NIX.startswith("@"):
     HOST_PREVIEW_NIX = "./support/host-preview.nix"
 
+INSTALL_PLAN_NIX = "@installPlanNix@"
+if INSTALL_PLAN_NIX.startswith("@"):
+    INSTALL_PLAN_NIX = "./support/install-plan.nix"
+
 
 nix_pkg_path = "@path@"
 if not nix_pkg_path.startswith("@"):
@@ -76,24 +104,29 @@ class ListedFlake:
     offlineHosts: dict[str, bool] = field(default_factory=dict, hash=False)
 
     @property
-    def online_only_hosts(self) -> set[str]:
-        return self.hosts_available - self.offline_hosts_available
+    def online_only_hosts(self) -> Sequence[str]:
+        "fqdn sorted"
+        return FLAKE_REGISTRY.hosts(self).online_only
 
     @property
-    def hosts_available(self) -> set[str]:
-        if self.is_offline and self.offlineOnly:
-            return self.offline_hosts_available
-        return self.all_hosts_listed
+    def hosts_available(self) -> Sequence[str]:
+        "fqdn sorted"
+        return FLAKE_REGISTRY.hosts(self).available
 
-    @cached_property
-    def offline_hosts_available(self) -> set[str]:
-        if not self.is_offline:
-            return set()
-        optimism = not any(self.offlineHosts.values())
-        return {h for h in self.all_hosts_listed if self.offlineHosts.get(h, optimism)}
+    @property
+    def offline_hosts_available(self) -> Sequence[str]:
+        "fqdn sorted"
+        return FLAKE_REGISTRY.hosts(self).offline
 
-    @cached_property
-    def all_hosts_listed(self) -> set[str]:
+    @property
+    def all_hosts_listed(self) -> Sequence[str]:
+        "fqdn sorted"
+        return FLAKE_REGISTRY.hosts(self).all
+
+    def list_hosts(self) -> set[str]:
+        "evaluates the flake at its locked revision, use FLAKE_REGISTRY to reuse results"
+        NETWORK.require(self.reference)
+        locked = FLAKE_REGISTRY.locked_reference(self)
         raw_data = call_for_info(
             [
                 "nix",
@@ -101,7 +134,7 @@ class ListedFlake:
                 "--extra-experimental-features",
                 "nix-command flakes",
                 "--raw",
-                f"{self.reference}#nixosConfigurations",
+                f"{locked}#nixosConfigurations",
                 "--apply",
                 'a: with builtins; concatStringsSep "\\n" (attrNames a) + "\\n"',
             ],
@@ -113,6 +146,25 @@ class ListedFlake:
     def is_offline(self) -> bool:
         return self.reference.startswith("/nix/store/")
 
+    def lock_reference(self) -> str:
+        "returns a locked reference, so repeated evaluations refer to the same revision"
+        if self.is_offline:
+            return self.reference  # store paths cannot change anyway
+        NETWORK.require(self.reference)
+        raw_data = call_for_info(
+            [
+                "nix",
+                "flake",
+                "metadata",
+                "--extra-experimental-features",
+                "nix-command flakes",
+                "--json",
+                self.reference,
+            ],
+            stderr_suppress=True,
+        )
+        return json.loads(raw_data)["url"]
+
     @property
     def str_key(self) -> str:
         "can be used as a string key to re-identify the same ListedFlake object from a list of them"
@@ -120,19 +172,174 @@ class ListedFlake:
 
     @staticmethod
     def from_dict(d: dict[str, Any]) -> ListedFlake:
-        return ListedFlake(**d)
+        return FLAKE_REGISTRY.register(ListedFlake(**d))
+
+
+@dataclass(
+    frozen=True,
+)
+class FlakeHosts:
+    "host index of a ListedFlake, each fqdn sorted"
+
+    all: Sequence[str]
+    available: Sequence[str]
+    offline: Sequence[str]
+    online_only: Sequence[str]
+
+    @staticmethod
+    def index(flake: ListedFlake, hosts: Iterable[str]) -> FlakeHosts:
+        all_hosts = fqdn_sorted(hosts)
+        offline: list[str] = []
+        if flake.is_offline:
+            optimism = not any(flake.offlineHosts.values())
+            offline = [h for h in all_hosts if flake.offlineHosts.get(h, optimism)]
+        available = offline if flake.is_offline and flake.offlineOnly else all_hosts
+        offline_set = set(offline)
+        return FlakeHosts(
+            all=all_hosts,
+            available=available,
+            offline=offline,
+            online_only=[h for h in available if h not in offline_set],
+        )
+
+
+class FlakeRegistry:
+    """
+    process-wide cache of everything discovered about flakes,
+    so repeated menu visits do not evaluate them again
+    """
+
+    def __init__(self) -> None:
+        self.__flakes: dict[ListedFlake, ListedFlake] = {}
+        self.__hosts: dict[str, set[str]] = {}
+        "reference -> hosts listed by that flake"
+        self.__indices: dict[ListedFlake, FlakeHosts] = {}
+        self.__facts: dict[tuple[str, str], dict[str, Any]] = {}
+        "(reference, host) -> fact name (e.g. preview) -> JSON compatible value"
+        self.__locked: dict[str, str] = {}
+        "reference -> locked reference"
+        self.__restored: dict[str, dict[str, Any]] = {}
+        "reference -> exported data, not yet validated against its locked reference"
+
+    def register(self, flake: ListedFlake) -> ListedFlake:
+        "returns the instance already known equal to the given one"
+        return self.__flakes.setdefault(flake, flake)
+
+    def hosts(self, flake: ListedFlake) -> FlakeHosts:
+        index = self.__indices.get(flake)
+        if index is None:
+            self.__validate(flake)
+            hosts = self.__hosts.get(flake.reference)
+            if hosts is None:
+                hosts = self.__hosts[flake.reference] = flake.list_hosts()
+            index = self.__indices[flake] = FlakeHosts.index(flake, hosts)
+        return index
+
+    def host_fact(
+        self,
+        config: ConfigSource,
+        name: str,
+        evaluate: Callable[[], Any],
+    ) -> Any:
+        "only caches successful evaluations, results must be JSON compatible"
+        self.__validate(config.flake)
+        facts = self.__facts.setdefault((config.flake.reference, config.host), {})
+        if name not in facts:
+            facts[name] = evaluate()
+        return facts[name]
+
+    def host_preview(self, config: ConfigSource, timeout: float | None = None) -> str:
+        return self.host_fact(
+            config, "preview", lambda: config.render_host_preview(timeout)
+        )
+
+    def locked_reference(self, flake: ListedFlake) -> str:
+        locked = self.__locked.get(flake.reference)
+        if locked is None:
+            locked = self.__locked[flake.reference] = flake.lock_reference()
+        return locked
+
+    def refresh(self) -> None:
+        "forgets all discovered data, e.g. after the network became available"
+        self.__locked.clear()
+        self.__hosts.clear()
+        self.__indices.clear()
+        self.__facts.clear()
+        self.__restored.clear()
+
+    def export(self) -> dict[str, Any]:
+        "data discovered about locked flakes, see SessionSnapshot"
+        exported: dict[str, Any] = {
+            reference: {"locked": locked, "hosts": None, "facts": {}}
+            for reference, locked in self.__locked.items()
+        }
+        for reference, hosts in self.__hosts.items():
+            if reference in exported:
+                exported[reference]["hosts"] = sorted(hosts)
+        for (reference, host), facts in list(self.__facts.items()):
+            if reference in exported and facts:
+                exported[reference]["facts"][host] = dict(facts)
+        # keep data restored previously, but not required again yet
+        return self.__restored | exported
+
+    def restore(self, exported: dict[str, Any]) -> None:
+        "data is only used after validation, see __validate"
+        self.__restored.update(exported)
+
+    def __validate(self, flake: ListedFlake) -> None:
+        "adopts restored data if the flake is still locked to the same revision"
+        restored = self.__restored.pop(flake.reference, None)
+        if restored is None or self.locked_reference(flake) != restored["locked"]:
+            return
+        if restored["hosts"] is not None:
+            self.__hosts.setdefault(flake.reference, set(restored["hosts"]))
+        for host, facts in restored["facts"].items():
+            known = self.__facts.setdefault((flake.reference, host), {})
+            known.update({k: v for k, v in facts.items() if k not in known})
 
 
 @dataclass
 class Settings:
     allowFlakeInput: bool = True
+    copyJobs: int = 4
     debugMode: bool = True
     defaultFlake: str = "github:Zocker1999NET/server"
     defaultHost: str = "empty"
-    diskoInstallFlags: list[str] = field(default_factory=list)
+    discardDisks: bool = False
+    diskBenchmark: bool = False
+    evalJobs: int = 4
+    evalTimeout: float = 120
+    "in seconds, per host"
+    extraSubstituters: list[str] = field(default_factory=list)
+    extraTrustedPublicKeys: list[str] = field(default_factory=list)
+    hostMatchIndex: dict[str, dict[str, str]] = field(default_factory=dict)
+    "hardware identifier -> title of flake entry & host name"
     listedFlakes: list[ListedFlake] = field(default_factory=list)
+    lowBandwidth: bool | None = None  # None = detect serial console
+    nixosInstallFlags: list[str] = field(default_factory=list)
+    serveStorePort: int | None = None  # None = serving store disabled
+    sessionSnapshot: str | None = None  # None = in STATE_DIR
+    statusCollector: str | None = None  # None = status reporting disabled
     writeEfiBootEntries: bool | None = None  # None = depending on selected config
 
+    @cached_property
+    def low_bandwidth(self) -> bool:
+        if self.lowBandwidth is not None:
+            return self.lowBandwidth
+        return is_serial_terminal()
+
+    @property
+    def substituter_args(self) -> Sequence[str]:
+        "for nix commands which may download store paths"
+        args: list[str] = []
+        if self.extraSubstituters:
+            args.extend(("--extra-substituters", " ".join(self.extraSubstituters)))
+        if self.extraTrustedPublicKeys:
+            args.extend(
+                ("--extra-trusted-public-keys", " ".join(self.extraTrustedPublicKeys))
+            )
+        return args
+
     @cached_property
     def defaultHostConfig(self) -> ConfigSource:
         online_flake, offline_flake = self.__search_default_flakes()
@@ -143,7 +350,33 @@ class Settings:
             and (online_flake is None or online_flake.reference == self.defaultFlake)
             else self.defaultFlake
         )
-        return ConfigSource(ListedFlake(default_flake), self.defaultHost)
+        return ConfigSource(
+            FLAKE_REGISTRY.register(ListedFlake(default_flake)), self.defaultHost
+        )
+
+    @cached_property
+    def matchedHostConfig(self) -> ConfigSource | None:
+        "config intended for the hardware the menu runs on, found without evaluation"
+        if not self.hostMatchIndex:
+            return None
+        for key in hardware_match_keys():
+            match = self.hostMatchIndex.get(key)
+            if match is not None:
+                return self.__resolve_match(match["title"], match["host"])
+        return None
+
+    def __resolve_match(self, title: str, host: str) -> ConfigSource | None:
+        flakes = {f.title: f for f in self.listedFlakes}
+        # prefer offline flake like defaultHostConfig, if it caches the host
+        offline_flake = flakes.get(f"{title} (offline)")
+        if offline_flake is not None:
+            optimism = not any(offline_flake.offlineHosts.values())
+            if offline_flake.offlineHosts.get(host, optimism):
+                return ConfigSource(offline_flake, host)
+        online_flake = flakes.get(title)
+        if online_flake is None:
+            return None
+        return ConfigSource(online_flake, host)
 
     def __search_default_flakes(self) -> tuple[ListedFlake | None, ListedFlake | None]:
         # TODO replace hacky trick with cleaner config syntax
@@ -153,8 +386,20 @@ class Settings:
         return flakes.get(DEFAULT_FLAKE_NAME), flakes.get(DEFAULT_FLAKE_OFFLINE)
 
 
+FLAKE_REGISTRY = FlakeRegistry()
 CONFIG = Settings()
 CONFIG_PATH = Path(os.getenv("CONFIG_PATH", f"/etc/{APP_NAME}/config"))
+STATE_DIR = Path(os.getenv("STATE_DIR", f"/run/{APP_NAME}"))
+MOUNT_POINT = Path("/mnt")
+"where the disks of the target system are mounted during installation"
+MOUNTED_MARKER = STATE_DIR / "mounted"
+"contains InstallPlan.mount_key of the disks mounted at MOUNT_POINT"
+LOW_BANDWIDTH_PREVIEW_DELAY = 0.3
+"in seconds"
+DEFAULT_SUBSTITUTER = "https://cache.nixos.org"
+"used by nix unless configured otherwise"
+BACKGROUND_POOL = ThreadPoolExecutor(thread_name_prefix=f"{APP_NAME}-background")
+"for tasks whose results are not required immediately"
 
 
 # === lib
@@ -176,14 +421,116 @@ def lazy_combine_tristate(
     return wrapper
 
 
+def hardware_match_keys() -> Iterator[str]:
+    "identifiers of this machine as keys of Settings.hostMatchIndex, most specific first"
+    dmi_dir = Path("/sys/class/dmi/id")
+    for name in ("product_uuid", "product_serial", "board_serial"):
+        value = read_sysfs(dmi_dir / name)
+        if value:
+            yield f"{name}:{value.lower()}"
+    net_dir = Path("/sys/class/net")
+    for interface in sorted(net_dir.iterdir()) if net_dir.is_dir() else ():
+        mac = read_sysfs(interface / "address")
+        if mac and mac != "00:00:00:00:00:00":  # e.g. loopback
+            yield f"mac:{mac.lower()}"
+    for disk in DiskInfo.list_all():  # only listed if no earlier identifier matched
+        if disk.serial:
+            yield f"disk_serial:{disk.serial.lower()}"
+
+
+def read_sysfs(path: Path) -> str | None:
+    "None if missing or not readable (e.g. DMI serials require root)"
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def is_serial_terminal() -> bool:
+    "e.g. serial console or IPMI SOL, where redrawing the whole screen is slow"
+    try:
+        tty_name = os.ttyname(sys.stdout.fileno())
+        speed = termios.tcgetattr(sys.stdout.fileno())[5]  # output speed
+    except (OSError, termios.error):
+        return False
+    if re.fullmatch(r"/dev/tty(S|AMA|USB)[0-9]+", tty_name) is None:
+        return False  # virtual consoles & pseudo terminals report misleading speeds
+    return speed <= termios.B115200
+
+
+def env_int(name: str) -> int | None:
+    value = os.getenv(name)
+    return int(value) if value is not None and value.isdigit() else None
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 1:
+        return f"{seconds:.1f}s"
+    return f"{int(minutes)}m{seconds:04.1f}s"
+
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+@dataclass
+class TransferProgress:
+    total_bytes: int
+    total_items: int
+    item_name: str = "items"
+    done_bytes: int = 0
+    done_items: int = 0
+    start: float = field(default_factory=time.monotonic)
+
+    def advance(self, size: int, items: int = 1) -> None:
+        self.done_bytes += size
+        self.done_items += items
+
+    @property
+    def throughput(self) -> float:
+        "in bytes per second"
+        elapsed = time.monotonic() - self.start
+        return self.done_bytes / elapsed if elapsed > 0 else 0
+
+    @property
+    def eta(self) -> float | None:
+        "in seconds, None if unknown"
+        throughput = self.throughput
+        if throughput <= 0:
+            return None
+        return (self.total_bytes - self.done_bytes) / throughput
+
+    @property
+    def line(self) -> str:
+        percent = 100 * self.done_bytes / self.total_bytes if self.total_bytes else 100
+        eta = self.eta
+        return " - ".join(
+            (
+                f"{format_size(self.done_bytes)} / {format_size(self.total_bytes)} ({percent:.0f}%)",
+                f"{self.done_items}/{self.total_items} {self.item_name}",
+                f"{format_size(self.throughput)}/s",
+                f"ETA {'?' if eta is None else format_duration(eta)}",
+            )
+        )
+
+
 # === initialization
 
 
 def main():
     args = parse_args()
+    if args.status_aggregator:
+        return aggregate_status(args.status_aggregator)  # runs without config
     read_config()
     if args.preview_call:
-        return MenuSelection.render_preview(*args.preview_call)
+        return MenuSelection.render_preview(
+            *args.preview_call, delay=args.preview_delay
+        )
     if args.debug_test_build:
         plan = InstallPlan(
             config=CONFIG.defaultHostConfig,
@@ -195,6 +542,10 @@ def main():
             safe=True,
         )
         return
+    if CONFIG.statusCollector is not None:
+        STATUS.start(CONFIG.statusCollector)
+    NETWORK.start(network_endpoints())
+    SESSION.restore()
     mode_select(args)
 
 
@@ -206,11 +557,23 @@ def read_config():
         data = json.load(fd)
     CONFIG = Settings(
         allowFlakeInput=data.get("allowFlakeInput", True),
+        copyJobs=data.get("copyJobs", 4),
         debugMode=data.get("debugMode", False),
         defaultFlake=data["defaultFlake"],
         defaultHost=data["defaultHost"],
-        diskoInstallFlags=data.get("diskoInstallFlags", list()),
+        discardDisks=data.get("discardDisks", False),
+        diskBenchmark=data.get("diskBenchmark", False),
+        evalJobs=data.get("evalJobs", 4),
+        evalTimeout=data.get("evalTimeout", 120),
+        extraSubstituters=data.get("extraSubstituters", list()),
+        extraTrustedPublicKeys=data.get("extraTrustedPublicKeys", list()),
+        hostMatchIndex=data.get("hostMatchIndex", dict()),
         listedFlakes=list(map(ListedFlake.from_dict, data.get("listedFlakes", list()))),
+        lowBandwidth=data.get("lowBandwidth", None),
+        nixosInstallFlags=data.get("nixosInstallFlags", list()),
+        serveStorePort=data.get("serveStorePort", None),
+        sessionSnapshot=data.get("sessionSnapshot", None),
+        statusCollector=data.get("statusCollector", None),
         writeEfiBootEntries=data.get("writeEfiBootEntries", None),
     )
 
@@ -227,6 +590,17 @@ def parse_args():
         nargs=2,  # sub-args are passed to function render_preview(…)
         help="used internally only (to generate previews for fzf)",
     )
+    parser.add_argument(
+        "--preview-delay",
+        type=float,
+        default=0,
+        help="used internally only (to throttle previews for fzf)",
+    )
+    parser.add_argument(
+        "--status-aggregator",
+        metavar="ADDRESS",
+        help="instead of the menu, show a table of all installers reporting their status to ADDRESS (e.g. udp://0.0.0.0:9999 or http://0.0.0.0:9999), see option statusCollector",
+    )
     parser.add_argument(
         "--debug-test-build",
         action="store_true",
@@ -240,6 +614,14 @@ def parse_args():
 
 def mode_select(args):
     extra_options = []
+    if CONFIG.serveStorePort is not None:
+        extra_options.append(
+            SimpleMenuOption(
+                "serve",
+                "serve store to peers",
+                f"provide the Nix store of this installer\nas binary cache on port {CONFIG.serveStorePort}\nuntil you return to this menu\n\nother installers can use it as substituter,\nso the same paths are downloaded only once from upstream",
+            )
+        )
     if not args.no_global_exit:
         extra_options.append(
             SimpleMenuOption(
@@ -289,6 +671,9 @@ def mode_select(args):
         if sel.tag == "shell":
             open_shell()
             continue
+        if sel.tag == "serve":
+            serve_store()
+            continue
         if sel.tag == "exit":
             return
         break
@@ -300,17 +685,89 @@ def mode_select(args):
 
 def install_select():
     flake_by_key = {f.str_key: f for f in CONFIG.listedFlakes}
-    options = [
+    while True:
+        # cheap to regenerate, as FLAKE_REGISTRY remembers discovered hosts & previews
+        options = generate_install_options()
+        menu = MenuSelection.new(
+            MenuDesign(border_label="what do you want to do?", header="install …"),
+            *options,
+        )
+        sel = menu.show_selection()
+        if sel is None or sel.tag == "return":
+            return
+        try:
+            if sel.tag == "flake_input" and CONFIG.allowFlakeInput:
+                user_flake = flake_input()
+                if user_flake is not None:
+                    # listed flakes are candidates anyway, so keep history for typed ones
+                    host_select(
+                        user_flake, remember=user_flake not in CONFIG.listedFlakes
+                    )
+                continue
+            if sel.tag.startswith("flake:"):
+                flake_obj = flake_by_key[sel.tag[6:]]
+                host_select(flake_obj)
+                continue
+            if sel.tag == "default_host":
+                host_menu(CONFIG.defaultHostConfig)
+                continue
+            if sel.tag == "last_plan":
+                host_install_menus(SESSION.restore_plan())
+                continue
+            if sel.tag == "matched_host" and CONFIG.matchedHostConfig is not None:
+                host_menu(CONFIG.matchedHostConfig)
+                continue
+        except NetworkUnreachable as e:
+            print(e)
+            press_any_key("to return back to install menu")
+            continue
+        except subprocess.CalledProcessError as e:
+            # e.g. evaluating a broken config, its error was printed already
+            print(f"{shlex.join(map(str, e.cmd))} failed with exit code {e.returncode}")
+            press_any_key("to return back to install menu")
+            continue
+        if sel.tag == "refresh":
+            NETWORK.refresh()
+            FLAKE_REGISTRY.refresh()
+            FLAKE_INDEX.refresh()
+            continue
+        break
+    raise_invalid_choice(sel)
+
+
+def generate_install_options() -> list[MenuOption | None]:
+    options: list[MenuOption | None] = []
+    matched_config = CONFIG.matchedHostConfig
+    if matched_config is not None:
+        # first, so it is preselected
+        options.append(
+            LazyMenuOption(
+                "matched_host",
+                f"matching target ({matched_config.host})",
+                lambda: f"install config matching the hardware of this machine:\n{matched_config.short_spec}\n\n{config_preview(matched_config)}",
+            )
+        )
+    # after the matched host, as continuing an older plan is not the default
+    if SESSION.last_plan is not None:
+        options.append(
+            SimpleMenuOption(
+                "last_plan",
+                "continue last plan",
+                f"continue the plan selected before the menu was restarted:\n\n{SESSION.last_plan_preview}",
+            )
+        )
+    options.extend(
         generate_flake_option(flake)
         for flake in sorted(CONFIG.listedFlakes, key=lambda f: f.title)
-    ]
+    )
     options.extend(
         (
             (
                 SimpleMenuOption(
                     "flake_input",
                     "from flake URL",
-                    "prompt for flake URL\nto select NixOS configuration from\n\nrequires network connectivity",
+                    "prompt for flake URL\nto select NixOS configuration from\n\nrequires network connectivity, reachability of substituters:\n"
+                    + NETWORK.preview(substituter_endpoints()),
                 )
                 if CONFIG.allowFlakeInput
                 else None
@@ -319,7 +776,12 @@ def install_select():
                 "default_host",
                 "default target",
                 # TODO pre-render config preview
-                f"install config preselected for unattended installation:\n{CONFIG.defaultHostConfig.short_spec}\n\n{CONFIG.defaultHostConfig.host_preview}",
+                f"install config preselected for unattended installation:\n{CONFIG.defaultHostConfig.short_spec}\n\n{config_preview(CONFIG.defaultHostConfig)}",
+            ),
+            SimpleMenuOption(
+                "refresh",
+                "<refresh>",
+                "forget host lists & previews collected so far\nand collect them again when required\n\ne.g. after the network became available or the flakes were updated",
             ),
             SimpleMenuOption(
                 "return",
@@ -328,31 +790,76 @@ def install_select():
             ),
         )
     )
-    while True:
-        menu = MenuSelection.new(
-            MenuDesign(border_label="what do you want to do?", header="install …"),
-            *options,
-        )
-        sel = menu.show_selection()
-        if sel is None or sel.tag == "return":
-            return
-        if sel.tag == "flake_input" and CONFIG.allowFlakeInput:
-            user_flake = flake_input()
-            if user_flake is not None:
-                host_select(user_flake)
-            continue
-        if sel.tag.startswith("flake:"):
-            flake_obj = flake_by_key[sel.tag[6:]]
-            host_select(flake_obj)
-            continue
-        if sel.tag == "default_host":
-            host_menu(CONFIG.defaultHostConfig)
-            continue
-        break
-    raise_invalid_choice(sel)
+    return options
+
+
+def config_preview(config: ConfigSource) -> str:
+    try:
+        return config.host_preview
+    except NetworkUnreachable as e:
+        return f"currently unavailable, {e}"
 
 
 def flake_input() -> ListedFlake | None:
+    print("collecting known flakes …")
+    candidates = FLAKE_INDEX.candidates()
+    listed = {f.reference: f for f in CONFIG.listedFlakes}
+    options: list[MenuOption | None] = [
+        LazyMenuOption(
+            f"candidate:{i}",
+            f"{c.reference}  ({c.source})",
+            partial(flake_candidate_preview, c),
+        )
+        for i, c in enumerate(candidates)
+    ]
+    options.extend(
+        (
+            SimpleMenuOption(
+                "manual",
+                "<manual input>",
+                "type the flake url at a plain prompt instead",
+            ),
+            SimpleMenuOption(
+                "return",
+                "<return>",
+                "go back to the install menu",
+            ),
+        )
+    )
+    menu = MenuSelection.new(
+        MenuDesign(
+            border_label="insert flake url to retrieve NixOS configurations from",
+            header="select a known flake or type a new url\n(ALT+ENTER submits the typed url as is)",
+            prompt="flake> ",
+        ),
+        *options,
+    )
+    sel = menu.show_query_selection()
+    if sel is None or isinstance(sel, str):
+        reference = sel
+    elif sel.tag.startswith("candidate:"):
+        reference = candidates[int(sel.tag[10:])].reference
+    elif sel.tag == "manual":
+        reference = flake_manual_input()
+    elif sel.tag == "return":
+        return None
+    else:
+        raise_invalid_choice(sel)
+    if not reference:
+        return None
+    return listed.get(reference) or FLAKE_REGISTRY.register(ListedFlake(reference))
+
+
+def flake_candidate_preview(candidate: FlakeCandidate) -> Sequence[str]:
+    validation = FLAKE_INDEX.validation(candidate.reference)
+    status = "validating …" if validation is None else validation.line
+    header = f"{candidate.reference}\n\nfound in {candidate.source}"
+    if candidate.description:
+        header += f":\n{candidate.description}"
+    return (header, status)
+
+
+def flake_manual_input() -> str | None:
     print("> insert flake url to retrieve NixOS configurations from")
     print("for example:")
     examples = (
@@ -363,29 +870,27 @@ def flake_input() -> ListedFlake | None:
     print("(submit empty input or CTRL+D to return back to menu)")
     print()
     try:
-        user_input = input("flake> ")
+        return input("flake> ")
     except EOFError:
         return None
-    if user_input == "":
-        return None
-    return ListedFlake(user_input)
 
 
-def host_select(flake: ListedFlake):
+def host_select(flake: ListedFlake, remember: bool = False):
+    "remember: adds the flake to the history of FLAKE_INDEX once its hosts are listed"
     print("collection information for all host configurations, this may take a while …")
+    configs = [ConfigSource(flake, host) for host in flake.hosts_available]
+    if remember:
+        FLAKE_INDEX.remember(flake.reference)
+    previews, report = evaluate_host_previews(configs)
+    SESSION.save()
     options = [
-        # TODO preview_cmd for better performance
-        SimpleMenuOption(
-            "host",
-            host,
-            ConfigSource(flake, host).host_preview,
-        )
-        for host in fqdn_sorted(flake.hosts_available)
+        SimpleMenuOption("host", config.host, previews[config.host])
+        for config in configs
     ]
     options.append(
         SimpleMenuOption("return", "<return>", "go back to the previous menu"),
     )
-    print("(finished collecting host configurations)")
+    print(f"(finished collecting host configurations: {report.line})")
     while True:
         menu = MenuSelection.new(
             MenuDesign(
@@ -399,12 +904,85 @@ def host_select(flake: ListedFlake):
         if sel is None or sel.tag == "return":
             return
         if sel.tag == "host":
+            if sel.name in report.unusable_hosts:
+                # would fail or stall again when evaluated without timeout
+                print(f"evaluation of {sel.name} failed, see its preview for details")
+                print("(select the flake again to retry its evaluation)")
+                press_any_key("to return back to host selection")
+                continue
             host_menu(ConfigSource(flake, sel.name))
             continue
         break
     raise_invalid_choice(sel)
 
 
+@dataclass
+class EvaluationReport:
+    succeeded: int = 0
+    failed: int = 0
+    timed_out: int = 0
+    duration: float = 0
+    "in seconds"
+    unusable_hosts: set[str] = field(default_factory=set)
+    "failed or timed out"
+
+    @property
+    def line(self) -> str:
+        total = self.succeeded + self.failed + self.timed_out
+        return f"{total} hosts in {format_duration(self.duration)}, {self.succeeded} succeeded, {self.failed} failed, {self.timed_out} timed out"
+
+
+EVAL_ERROR_LINES = 20
+"last lines of an evaluation error shown as host preview"
+
+
+def evaluate_host_previews(
+    configs: Sequence[ConfigSource],
+) -> tuple[dict[str, str], EvaluationReport]:
+    "concurrently, so slow or broken hosts do not block the others, errors become their preview"
+    previews: dict[str, str] = {}
+    report = EvaluationReport()
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=CONFIG.evalJobs) as pool:
+        futures = {
+            pool.submit(FLAKE_REGISTRY.host_preview, config, CONFIG.evalTimeout): config
+            for config in configs
+        }
+        for future in as_completed(futures):
+            host = futures[future].host
+            try:
+                previews[host] = future.result()
+                report.succeeded += 1
+            except subprocess.TimeoutExpired:
+                previews[host] = (
+                    f"evaluation timed out after {format_duration(CONFIG.evalTimeout)}"
+                )
+                report.timed_out += 1
+                report.unusable_hosts.add(host)
+            except subprocess.CalledProcessError as e:
+                error_lines = (e.stderr or str(e)).rstrip().splitlines()
+                if len(error_lines) > EVAL_ERROR_LINES:
+                    omitted = len(error_lines) - EVAL_ERROR_LINES
+                    error_lines = [f"… ({omitted} lines omitted)"] + error_lines[
+                        -EVAL_ERROR_LINES:
+                    ]
+                previews[host] = "evaluation failed:\n" + "\n".join(error_lines)
+                report.failed += 1
+                report.unusable_hosts.add(host)
+            except NetworkUnreachable as e:
+                previews[host] = f"evaluation failed, {e}"
+                report.failed += 1
+                report.unusable_hosts.add(host)
+            print(
+                f"\r\033[K{len(previews)}/{len(configs)} hosts evaluated",
+                end="",
+                flush=True,
+            )
+    print()
+    report.duration = time.monotonic() - start
+    return previews, report
+
+
 def host_menu(config: ConfigSource):
     while True:
         menu = MenuSelection.new(
@@ -427,7 +1005,16 @@ def host_menu(config: ConfigSource):
             SimpleMenuOption(
                 "repl",
                 "repl",
-                "Gives you insight in the selected NixOS configuration via nixos-rebuild repl.",
+                "Gives you insight in the selected NixOS configuration via nixos-rebuild repl.\n\nThe flake is locked once & reused by later sessions,\nso these do not fetch it again (see <refresh> to update it).",
+            ),
+            (
+                SimpleMenuOption(
+                    "unmount",
+                    "unmount disks",
+                    f"unmount all disks mounted at {MOUNT_POINT}\n\nthese are kept mounted after entering an installation,\nso entering it again is faster",
+                )
+                if os.path.ismount(MOUNT_POINT)
+                else None
             ),
             SimpleMenuOption(
                 "return",
@@ -442,7 +1029,10 @@ def host_menu(config: ConfigSource):
             host_install_menus(InstallPlan(config, InstallMode.from_name(sel.tag)))
             continue
         if sel.tag == "repl":
-            call(["nixos-rebuild", "--flake", config.short_spec, "repl"])
+            call(["nixos-rebuild", "--flake", config.locked_spec, "repl"])
+            continue
+        if sel.tag == "unmount":
+            unmount_target()
             continue
         break
     raise_invalid_choice(sel)
@@ -454,18 +1044,31 @@ def host_install_menus(plan: InstallPlan | None) -> None:
     plan = ask_for_missing_disks(plan)
     if plan is None:
         return
+    SESSION.remember_plan(plan)
+    if plan.mode == InstallMode.ENTER:
+        return enter_installation(plan)
     on_success = action_on_success(plan)
     if on_success is None:
         return
+    if plan.mode.reuses_target_store:
+        print(f"[{APP_NAME}] Prepare Upgrade (to preview its changes)")
+        if plan.prepare() is not True:
+            print(f"[{APP_NAME}] Preparation Failed!")
+            print(f"[{APP_NAME}] (selecting the same upgrade again resumes it)")
+            open_shell()
+            return
     plan = confirm_menu(plan)
     if plan is None:
         return
+    SESSION.remember_plan(plan)  # including toggled options
     print(f"[{APP_NAME}] Start Installation")
     if plan.execute_install() is not True:
         print(f"[{APP_NAME}] Installation Failed!")
+        print(f"[{APP_NAME}] (selecting the same installation again resumes it)")
         open_shell()
         return
     print(f"[{APP_NAME}] Installation Completed Successfully 🎉")
+    SESSION.remember_plan(None)
     success_cmd = on_success.cmd
     if success_cmd is None:
         press_any_key("to return back to install menu")
@@ -474,19 +1077,40 @@ def host_install_menus(plan: InstallPlan | None) -> None:
     call(success_cmd)
 
 
+def enter_installation(plan: InstallPlan) -> None:
+    confirmed = confirm_menu(plan)
+    if confirmed is None:
+        return
+    if confirmed.execute_install() is not True:
+        print(f"[{APP_NAME}] Mounting Failed!")
+        open_shell()
+        return
+    print(f"[{APP_NAME}] entering installation, exit the shell to return to the menu")
+    call(["nixos-enter", "--root", str(MOUNT_POINT)])
+
+
 def confirm_menu(plan: InstallPlan) -> InstallPlan | None:
     while True:
         menu = MenuSelection.new(
             MenuDesign(border_label="confirm installation"),
-            SimpleMenuOption(
-                "install",
-                "<< INSTALL NOW >>",
-                f"this will {plan.mode.action_on_disk} following disks:\n\n{plan.disk_map_preview}\n\nand apply following config:\n\n{plan.config.host_preview}",
+            generate_confirm_option(plan),
+            (
+                SimpleMenuOption(
+                    "writeEfiBootEntries",
+                    f"writeEfiBootEntries = {plan.will_write_efi_boot_entries}",
+                    "submit to toggle\nwhether EFI boot entries will be written into EFI variables",
+                )
+                if InstallStage.BOOTLOADER in plan.stages
+                else None
             ),
-            SimpleMenuOption(
-                "writeEfiBootEntries",
-                f"writeEfiBootEntries = {plan.will_write_efi_boot_entries}",
-                "submit to toggle\nwhether EFI boot entries will be written into EFI variables",
+            (
+                SimpleMenuOption(
+                    "discardDisks",
+                    f"discardDisks = {plan.will_discard_disks}",
+                    "submit to toggle\nwhether all blocks of the selected disks are discarded before formatting\n\nthis speeds up later writes on SSDs & NVMe drives\ndisks not supporting discard are skipped",
+                )
+                if plan.mode.wipes_disks
+                else None
             ),
             SimpleMenuOption(
                 "return",
@@ -501,9 +1125,23 @@ def confirm_menu(plan: InstallPlan) -> InstallPlan | None:
             return plan
         if sel.tag == "writeEfiBootEntries":
             plan.writeEfiBootEntries = not plan.will_write_efi_boot_entries
+        if sel.tag == "discardDisks":
+            plan.discardDisks = not plan.will_discard_disks
     raise_invalid_choice(sel)
 
 
+def generate_confirm_option(plan: InstallPlan) -> MenuOption:
+    name = "<< ENTER NOW >>" if plan.mode == InstallMode.ENTER else "<< INSTALL NOW >>"
+    desc = f"this will {plan.mode.action_on_disk} following disks:\n\n{plan.disk_map_preview}\n\nand apply following config:\n\n{plan.config.host_preview}{plan.resume_preview}"
+    if not plan.mode.reuses_target_store:
+        return SimpleMenuOption("install", name, desc)
+    return LazyMenuOption(
+        "install",
+        name,
+        lambda: (desc, *ClosureDiff.preview(plan.closure_diff())),
+    )
+
+
 def action_on_success(plan: InstallPlan) -> CompletionAction | None:
     while True:
         menu = MenuSelection.new(
@@ -556,13 +1194,14 @@ def select_disk(
     plan: InstallPlan,
     disk_name: DiskName,
 ) -> DiskPath | None:
-    options = [
-        SimpleMenuOption(
-            f"disk:{disk.path}",
-            disk.description,
-            disk.preview_disk(),
-        )
-        for disk in DiskInfo.list_all()
+    required_size = plan.config.disko_min_sizes.get(disk_name)
+    checked_disks = [
+        (disk, disk.preflight(required_size)) for disk in DiskInfo.list_all()
+    ]
+    checked_disks.sort(key=lambda d: not d[1].compatible)  # stable sort
+    checks = {disk.path: check for disk, check in checked_disks}
+    options: list[MenuOption] = [
+        generate_disk_option(disk, check) for disk, check in checked_disks
     ]
     options.append(
         SimpleMenuOption(
@@ -591,12 +1230,33 @@ def select_disk(
             return None
         if sel.tag == "manual":
             return manual_disk_input(plan, disk_name)
+        if sel.tag.startswith("incompatible:"):
+            # instead of silently reopening the menu
+            path = DiskPath(sel.tag[13:])
+            print(f"{path} cannot be selected for {disk_name}:")
+            print(checks[path].preview)
+            press_any_key("to return back to disk selection")
+            continue
         if sel.tag.startswith("disk:"):
             return DiskPath(sel.tag[5:])
         break
     raise_invalid_choice(sel)
 
 
+def generate_disk_option(disk: DiskInfo, check: DiskCheck) -> MenuOption:
+    tag = f"disk:{disk.path}" if check.compatible else f"incompatible:{disk.path}"
+    name = f"{check.marker}{disk.description}"
+    sections = (check.preview, *disk.preview_disk())
+    if not CONFIG.diskBenchmark:
+        return SimpleMenuOption(tag, name, sections)
+    benchmark = disk.benchmark()
+    return LazyMenuOption(
+        tag,
+        name,
+        lambda: (*sections, DiskBenchmark.preview(benchmark)),
+    )
+
+
 def manual_disk_input(plan: InstallPlan, disk_name: DiskName) -> DiskPath | None:
     search_dirs = [Path("/dev")]
     search_dirs.extend(path for path in Path("/dev/disk").iterdir() if path.is_dir())
@@ -627,6 +1287,16 @@ def open_shell() -> None:
     call("bash -l", safe=True, echo=False)
 
 
+def serve_store() -> None:
+    call("systemctl start nix-serve.service")
+    print(f"> serving Nix store as binary cache on port {CONFIG.serveStorePort}")
+    print("peers may add one of following addresses to their extraSubstituters:")
+    print(f"- http://{socket.gethostname()}:{CONFIG.serveStorePort}")
+    call("ip -brief address", safe=True, echo=False)
+    press_any_key("to stop serving")
+    call("systemctl stop nix-serve.service")
+
+
 @dataclass
 class InstallPlan:
     # ones which should not be changed
@@ -635,57 +1305,274 @@ class InstallPlan:
     # ones which can be changed
     disk_map: dict[DiskName, DiskPath] = field(default_factory=dict)
     writeEfiBootEntries: bool | None = None
+    discardDisks: bool | None = None
+
+    def execute_install(
+        self,
+    ) -> (
+        Literal[True]
+        | subprocess.CalledProcessError
+        | NetworkUnreachable
+        | StageRefused
+    ):
+        state = InstallState.load(self)
+        error = self.execute_stages(self.stages, state)
+        STATUS.emit(
+            "install",
+            spec=self.config.short_spec,
+            state="failed" if error is not None else "completed",
+            durations={stage.title: d for stage, d in state.durations.items()},
+        )
+        if error is not None:
+            return error
+        print(state.durations_preview)
+        state.discard()
+        return True
 
-    def execute_install(self) -> Literal[True] | subprocess.CalledProcessError:
-        try:
-            # we pre-build here, despite that disko-install does the same
-            # because our debug/dry-run mode should actually attempt to build it
-            call(
-                self.pre_generation_cmd(),
-                safe=True,  # is non-destructive & part of debugging
-            )
-            call(
-                self.installation_cmd(),
-                safe=True,  # i.e. already checks for debug mode
+    def prepare(
+        self,
+    ) -> (
+        Literal[True]
+        | subprocess.CalledProcessError
+        | NetworkUnreachable
+        | StageRefused
+    ):
+        "executes the leading stages not modifying the target, so a later install resumes them"
+        stages = takewhile(lambda s: not s.modifies_target, self.stages)
+        error = self.execute_stages(tuple(stages), InstallState.load(self))
+        return True if error is None else error
+
+    def execute_stages(
+        self,
+        stages: Sequence[InstallStage],
+        state: InstallState,
+    ) -> subprocess.CalledProcessError | NetworkUnreachable | StageRefused | None:
+        for stage in stages:
+            if stage in state.durations and not stage.always_repeat:
+                print(
+                    f"[{APP_NAME}] skip {stage.title} (completed by previous attempt)"
+                )
+                continue
+            print(f"[{APP_NAME}] {stage.title} …")
+            STATUS.emit("stage", stage=stage.title, state="started")
+            start = time.monotonic()
+            try:
+                self.execute_stage(stage, state)
+            except (
+                subprocess.CalledProcessError,
+                NetworkUnreachable,
+                StageRefused,
+            ) as e:
+                duration = format_duration(time.monotonic() - start)
+                print(f"[{APP_NAME}] {stage.title} failed after {duration}")
+                if isinstance(e, (NetworkUnreachable, StageRefused)):
+                    print(e)
+                STATUS.emit("stage", stage=stage.title, state="failed", error=str(e))
+                return e
+            state.durations[stage] = time.monotonic() - start
+            STATUS.emit(
+                "stage",
+                stage=stage.title,
+                state="done",
+                duration=state.durations[stage],
             )
-        except subprocess.CalledProcessError as e:
-            return e
-        return True
+            state.save()
+            duration = format_duration(state.durations[stage])
+            print(f"[{APP_NAME}] {stage.title} done in {duration}")
+        return None
+
+    def execute_stage(self, stage: InstallStage, state: InstallState) -> None:
+        match stage:
+            case InstallStage.RESOLVE:
+                state.outputs["flake"] = FLAKE_REGISTRY.locked_reference(
+                    self.config.flake
+                )
+            case InstallStage.BUILD:
+                # built before any disk is touched, so build failures are harmless
+                # & because our debug/dry-run mode should actually attempt to build it
+                state.outputs.update(self.realise(self.build_attrs, state))
+            case InstallStage.DISCARD:
+                unmount_target()  # disks may still be mounted by InstallMode.ENTER
+                discard_disks(self.disk_map)
+            case InstallStage.FORMAT:
+                unmount_target()  # disks may still be mounted by InstallMode.ENTER
+                call([state.outputs["diskoScript"]])
+                self.mark_mounted()  # diskoScript mounts as well, so MOUNT reuses it
+            case InstallStage.MOUNT:
+                if self.is_mounted:
+                    print(f"[{APP_NAME}] reuse disks still mounted at {MOUNT_POINT}")
+                    return
+                unmount_target()  # may still hold disks of another plan
+                call([state.outputs["mountScript"]])
+                self.mark_mounted()
+            case InstallStage.COPY:
+                ClosureCopy.plan(
+                    state.outputs["toplevel"],
+                    root=MOUNT_POINT,
+                    skip_present=self.mode.reuses_target_store,
+                ).execute()
+            case InstallStage.BOOTLOADER:
+                call(
+                    [
+                        "nixos-install",
+                        "--no-root-passwd",
+                        "--no-channel-copy",
+                        "--system",
+                        state.outputs["toplevel"],
+                        "--root",
+                        str(MOUNT_POINT),
+                        *CONFIG.nixosInstallFlags,
+                    ]
+                )
+            case InstallStage.FINALIZE:
+                unmount_target()
+            case _ as unreachable:
+                assert_never(unreachable)
+
+    def realise(self, attrs: Sequence[str], state: InstallState) -> dict[str, str]:
+        "builds artifacts of the installation together & returns their store paths"
+        # is non-destructive & part of debugging, so executed in debug mode as well
+        call_with_build_status(self.build_cmd(attrs, state.outputs.get("flake")))
+        return {attr: str(self.gc_root(i).resolve()) for i, attr in enumerate(attrs)}
 
-    def pre_generation_cmd(self, non_interactive: bool = False) -> Sequence[str] | None:
-        """can be executed before installation_cmd to have a fancier progress display
+    def pre_generation_cmd(self, non_interactive: bool = False) -> Sequence[str]:
+        """builds the artifacts of the installation, same as the build stage
 
         not required to be executed at all
         """
-        if not self.mode.utilizes_prebuild:
-            return None
+        return self.build_cmd(self.build_attrs, non_interactive=non_interactive)
+
+    @property
+    def build_attrs(self) -> Sequence[str]:
+        "artifacts required by the stages of this plan"
+        required = (
+            (InstallStage.COPY, "toplevel"),
+            (InstallStage.FORMAT, "diskoScript"),
+            (InstallStage.MOUNT, "mountScript"),
+        )
+        return tuple(attr for stage, attr in required if stage in self.stages)
+
+    def build_cmd(
+        self,
+        attrs: Sequence[str],
+        reference: str | None = None,
+        non_interactive: bool = False,
+    ) -> Sequence[str]:
+        """see ./support/install-plan.nix for available attributes
+
+        all are built by a single nix call, so nix evaluates once & schedules them together
+
+        if interactive, its log must be parsed by call_with_build_status
+        """
         return [
-            "nix" if non_interactive else "nom",
+            "nix",
             "build",
             "--extra-experimental-features",
             "nix-command flakes",
-            "-L",
+            *(("-L",) if non_interactive else ("--log-format", "internal-json")),
             "--show-trace",
-            "--no-link",
-            f"{self.config.flake_spec}.config.system.build.toplevel",
+            "--impure",  # required by builtins.getFlake for unlocked references
+            *CONFIG.substituter_args,
+            "--out-link",
+            str(self.gc_root()),  # keeps artifacts of interrupted installations
+            "--file",
+            INSTALL_PLAN_NIX,
+            "--argstr",
+            "flake",
+            self.config.flake.reference if reference is None else reference,
+            "--argstr",
+            "host",
+            self.config.host,
+            "--argstr",
+            "diskMappings",
+            json.dumps(self.disk_map),
+            "--arg",
+            "writeEfiBootEntries",
+            "true" if self.will_write_efi_boot_entries else "false",
+            "--argstr",
+            "rootMountPoint",
+            str(MOUNT_POINT),
+            *attrs,
         ]
 
-    def installation_cmd(self) -> Sequence[str]:
-        disko_args = ["disko-install", "--flake", self.config.short_spec]
-        if CONFIG.debugMode:
-            disko_args.append("--dry-run")
-        disko_args.extend(CONFIG.diskoInstallFlags)
-        if self.will_write_efi_boot_entries:
-            disko_args.append("--write-efi-boot-entries")
-        for name, path in self.disk_map.items():
-            disko_args.extend(("--disk", name, path))
-        disko_args.extend(self.mode.disko_args)
-        return disko_args
+    def gc_root(self, index: int = 0) -> Path:
+        "of the index-th artifact built by build_cmd"
+        base = STATE_DIR / f"install-{self.state_key}-build"
+        # nix build appends a counter for further installables
+        return base if index == 0 else base.with_name(f"{base.name}-{index}")
+
+    @property
+    def state_key(self) -> str:
+        "identifies installations which can resume each other"
+        plan_data = json.dumps(
+            [
+                self.config.short_spec,
+                self.mode.name,
+                self.disk_map,
+                # otherwise DISCARD would run after FORMAT was completed before
+                self.will_discard_disks,
+                self.will_write_efi_boot_entries,
+            ],
+            sort_keys=True,
+        )
+        return hashlib.sha256(plan_data.encode()).hexdigest()[:16]
+
+    def closure_diff(self) -> Future[ClosureDiff] | None:
+        "computed in the background, None if the system was not built yet (see prepare)"
+        toplevel = InstallState.load(self).outputs.get("toplevel")
+        if toplevel is None:
+            return None
+        key = f"{self.mount_key}:{toplevel}"
+        future = CLOSURE_DIFFS.get(key)
+        if future is None:
+            future = CLOSURE_DIFFS[key] = BACKGROUND_POOL.submit(
+                ClosureDiff.compare, toplevel, MOUNT_POINT
+            )
+        return future
+
+    @property
+    def mount_key(self) -> str:
+        "identifies plans mounting the same disks the same way"
+        mount_data = json.dumps([self.config.short_spec, self.disk_map], sort_keys=True)
+        return hashlib.sha256(mount_data.encode()).hexdigest()[:16]
+
+    def mark_mounted(self) -> None:
+        "after the disks were mounted as this plan would mount them"
+        MOUNTED_MARKER.parent.mkdir(parents=True, exist_ok=True)
+        MOUNTED_MARKER.write_text(self.mount_key)
+
+    @property
+    def is_mounted(self) -> bool:
+        "whether the disks are still mounted as this plan would mount them"
+        if not os.path.ismount(MOUNT_POINT) or not MOUNTED_MARKER.is_file():
+            return False
+        return MOUNTED_MARKER.read_text() == self.mount_key
 
     @property
     def disk_map_preview(self) -> str:
         return "\n".join(f"{name} -> {path}" for name, path in self.disk_map.items())
 
+    @property
+    def resume_preview(self) -> str:
+        state = InstallState.load(self)
+        if not state.durations:
+            return ""
+        return f"\n\nresuming previous attempt, already completed:\n\n{state.durations_preview}"
+
+    @property
+    def stages(self) -> Sequence[InstallStage]:
+        return tuple(
+            s
+            for s in self.mode.stages
+            if s != InstallStage.DISCARD or self.will_discard_disks
+        )
+
+    @property
+    @lazy_combine_tristate
+    def will_discard_disks(self) -> Generator[bool | None, None, bool]:
+        yield self.discardDisks
+        return CONFIG.discardDisks
+
     @property
     @lazy_combine_tristate
     def will_write_efi_boot_entries(self) -> Generator[bool | None, None, bool]:
@@ -698,17 +1585,613 @@ class InstallPlan:
         return self.config.get_option("boot.loader.efi.canTouchEfiVariables")
 
 
-class CompletionAction(Enum):
-    SHUTDOWN = auto()
-    REBOOT = auto()
-    FIRMWARE = auto()
-    MENU = auto()
+@dataclass
+class InstallState:
+    """progress of an InstallPlan, persisted after each completed stage
 
-    @property
-    def cmd(self) -> Sequence[str] | None:
-        match self:
-            case CompletionAction.SHUTDOWN:
-                return ["systemctl", "poweroff"]
+    so a failed installation can be retried without repeating completed stages
+    """
+
+    path: Path
+    durations: dict[InstallStage, float] = field(default_factory=dict)
+    "of completed stages, in seconds"
+    outputs: dict[str, str] = field(default_factory=dict)
+    "results of stages required by later stages"
+
+    @staticmethod
+    def load(plan: InstallPlan) -> InstallState:
+        path = STATE_DIR / f"install-{plan.state_key}.json"
+        if not path.is_file():
+            return InstallState(path)
+        with path.open("r") as fd:
+            data = json.load(fd)
+        return InstallState(
+            path,
+            durations={InstallStage[k]: v for k, v in data["durations"].items()},
+            outputs=data["outputs"],
+        )
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with tmp_path.open("w") as fd:
+            json.dump(
+                {
+                    "durations": {k.name: v for k, v in self.durations.items()},
+                    "outputs": self.outputs,
+                },
+                fd,
+            )
+        tmp_path.replace(self.path)  # atomic, so an interruption cannot corrupt it
+
+    def discard(self) -> None:
+        self.path.unlink(missing_ok=True)
+        for gc_root in self.path.parent.glob(f"{self.path.stem}-*"):
+            gc_root.unlink()
+
+    @property
+    def durations_preview(self) -> str:
+        return "\n".join(
+            f"{stage.title}: {format_duration(duration)}"
+            for stage, duration in self.durations.items()
+        )
+
+
+class SessionSnapshot:
+    """persists discovered flake data & the last plan,
+    so a restarted menu neither evaluates nor asks for them again
+
+    restored data is validated lazily,
+    flake data against the locked flake revision (see FlakeRegistry)
+    & disks of the plan against their serials (see restore_plan)
+    """
+
+    VERSION = 1
+
+    def __init__(self) -> None:
+        self.last_plan: dict[str, Any] | None = None
+        "as restored or remembered"
+
+    @property
+    def path(self) -> Path:
+        if CONFIG.sessionSnapshot is not None:
+            return Path(CONFIG.sessionSnapshot)
+        return STATE_DIR / "session.json"
+
+    def restore(self) -> None:
+        try:
+            with self.path.open("r") as fd:
+                data = json.load(fd)
+        except (OSError, ValueError):
+            return  # no or unusable snapshot, so start from scratch
+        if data.get("version") != self.VERSION:
+            return
+        FLAKE_REGISTRY.restore(data["flakes"])
+        self.last_plan = data["plan"]
+
+    def save(self) -> None:
+        data = {
+            "version": self.VERSION,
+            "flakes": FLAKE_REGISTRY.export(),
+            "plan": self.last_plan,
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with tmp_path.open("w") as fd:
+                json.dump(data, fd)
+            tmp_path.replace(
+                self.path
+            )  # atomic, so a crash never leaves a partial file
+        except OSError as e:
+            print(f"[{APP_NAME}] could not save session snapshot: {e}", file=sys.stderr)
+
+    def remember_plan(self, plan: InstallPlan | None) -> None:
+        "None after the plan was executed"
+        if plan is None:
+            self.last_plan = None
+        else:
+            serials = {disk.path: disk.serial for disk in DiskInfo.list_all()}
+            self.last_plan = {
+                "reference": plan.config.flake.reference,
+                "host": plan.config.host,
+                "mode": plan.mode.name,
+                "diskMap": plan.disk_map,
+                "diskSerials": {p: serials.get(p) for p in plan.disk_map.values()},
+                "writeEfiBootEntries": plan.writeEfiBootEntries,
+                "discardDisks": plan.discardDisks,
+            }
+        self.save()
+
+    def restore_plan(self) -> InstallPlan | None:
+        "drops disks whose serial changed since, so these are asked for again"
+        data = self.last_plan
+        if data is None:
+            return None
+        serials = {disk.path: disk.serial for disk in DiskInfo.list_all()}
+        flakes = {f.reference: f for f in CONFIG.listedFlakes}
+        flake = flakes.get(data["reference"]) or FLAKE_REGISTRY.register(
+            ListedFlake(data["reference"])
+        )
+        return InstallPlan(
+            config=ConfigSource(flake, data["host"]),
+            mode=InstallMode.from_name(data["mode"]),
+            disk_map={
+                DiskName(name): DiskPath(path)
+                for name, path in data["diskMap"].items()
+                if path in serials and serials[path] == data["diskSerials"].get(path)
+            },
+            writeEfiBootEntries=data["writeEfiBootEntries"],
+            discardDisks=data["discardDisks"],
+        )
+
+    @property
+    def last_plan_preview(self) -> str:
+        data = self.last_plan
+        if data is None:
+            return ""
+        mode = InstallMode.from_name(data["mode"])
+        disks = "\n".join(f"{n} -> {p}" for n, p in data["diskMap"].items())
+        return f"{mode.action_on_disk} following disks:\n\n{disks}\n\nwith following config:\n{data['reference']}#{data['host']}\n\n(disks are checked again against their serials)"
+
+
+SESSION = SessionSnapshot()
+
+
+@dataclass(
+    frozen=True,
+)
+class FlakeCandidate:
+    reference: str
+    source: str
+    "where it was found, e.g. history"
+    description: str = ""
+
+
+@dataclass(
+    frozen=True,
+)
+class FlakeValidation:
+    locked: str | None = None
+    problem: str | None = None
+
+    @property
+    def line(self) -> str:
+        if self.problem is not None:
+            return f"unreachable: {self.problem}"
+        return f"reachable, currently resolves to:\n{self.locked}"
+
+
+class FlakeIndex:
+    """candidates for the flake input & their reachability
+
+    candidates are flakes resolved successfully before (most recently used first),
+    the listed flakes & entries of the flake registries,
+    each validated in the background, so typos are caught before discovering hosts
+
+    validating fetches the flake, so registry entries are only validated
+    when their preview is shown
+    """
+
+    HISTORY_SIZE = 20
+    REGISTRY_TIMEOUT = 10.0
+    "in seconds"
+    VALIDATE_TIMEOUT = 30.0
+    "in seconds"
+    VALIDATE_JOBS = 4
+
+    def __init__(self) -> None:
+        self.__lock = Lock()
+        self.__registry: Future[Sequence[FlakeCandidate]] | None = None
+        self.__validations: dict[str, Future[FlakeValidation]] = {}
+        # not BACKGROUND_POOL, as validations wait for network probes running there
+        self.__pool = ThreadPoolExecutor(
+            max_workers=self.VALIDATE_JOBS,
+            thread_name_prefix=f"{APP_NAME}-flake-validation",
+        )
+
+    @property
+    def history_path(self) -> Path:
+        "next to the session snapshot, so both are kept on the same media"
+        return SESSION.path.with_name("flake-history.json")
+
+    def history(self) -> Sequence[str]:
+        "most recently used first"
+        try:
+            with self.history_path.open("r") as fd:
+                return [str(reference) for reference in json.load(fd)]
+        except (OSError, ValueError, TypeError):
+            return []
+
+    def remember(self, reference: str) -> None:
+        "after the flake was resolved successfully"
+        history = [reference, *(r for r in self.history() if r != reference)]
+        try:
+            self.history_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.history_path.with_suffix(".tmp")
+            with tmp_path.open("w") as fd:
+                json.dump(history[: self.HISTORY_SIZE], fd)
+            tmp_path.replace(self.history_path)
+        except OSError as e:
+            print(f"[{APP_NAME}] could not save flake history: {e}", file=sys.stderr)
+
+    def candidates(self) -> Sequence[FlakeCandidate]:
+        "deduplicated, starts validating the ones from history & listed flakes"
+        with self.__lock:
+            if self.__registry is None:
+                self.__registry = BACKGROUND_POOL.submit(self.__list_registry)
+            registry_future = self.__registry
+        try:
+            registry = registry_future.result(timeout=self.REGISTRY_TIMEOUT)
+        except TimeoutError:
+            registry = ()
+        listed = {f.reference for f in CONFIG.listedFlakes}
+        candidates = [
+            # listed flakes keep their title, even if in history of older versions
+            *(FlakeCandidate(r, "history") for r in self.history() if r not in listed),
+            *(
+                FlakeCandidate(f.reference, "listed flakes", f.title)
+                for f in CONFIG.listedFlakes
+            ),
+            *registry,
+        ]
+        unique = {c.reference: c for c in reversed(candidates)}  # first one wins
+        candidates = [c for c in candidates if unique[c.reference] is c]
+        for candidate in candidates:
+            if candidate.source in {"history", "listed flakes"}:
+                self.__validate(candidate.reference)
+        return candidates
+
+    def validation(self, reference: str) -> FlakeValidation | None:
+        "None while still validating"
+        future = self.__validate(reference)
+        return future.result() if future.done() else None
+
+    def refresh(self) -> None:
+        "forgets the registry & validations, e.g. after the network became available"
+        with self.__lock:
+            self.__registry = None
+            self.__validations.clear()
+
+    def __validate(self, reference: str) -> Future[FlakeValidation]:
+        with self.__lock:
+            future = self.__validations.get(reference)
+            if future is None:
+                future = self.__validations[reference] = self.__pool.submit(
+                    self.__check, reference
+                )
+            return future
+
+    def __check(self, reference: str) -> FlakeValidation:
+        problem = NETWORK.problem(reference, wait=True)
+        if problem is not None:
+            return FlakeValidation(problem=problem)
+        try:
+            proc = subprocess.run(
+                [
+                    "/usr/bin/env",
+                    "nix",
+                    "flake",
+                    "metadata",
+                    "--extra-experimental-features",
+                    "nix-command flakes",
+                    "--json",
+                    reference,
+                ],
+                capture_output=True,
+                text=True,
+                timeout=self.VALIDATE_TIMEOUT,
+            )
+        except subprocess.TimeoutExpired:
+            return FlakeValidation(
+                problem=f"no answer within {format_duration(self.VALIDATE_TIMEOUT)}"
+            )
+        if proc.returncode != 0:
+            lines = proc.stderr.strip().splitlines()
+            return FlakeValidation(problem=lines[-1] if lines else "nix failed")
+        return FlakeValidation(locked=json.loads(proc.stdout)["url"])
+
+    def __list_registry(self) -> Sequence[FlakeCandidate]:
+        "entries of all flake registries (user, system & global)"
+        try:
+            raw_data = call_for_info(
+                [
+                    "nix",
+                    "registry",
+                    "list",
+                    "--extra-experimental-features",
+                    "nix-command flakes",
+                ],
+                stderr_suppress=True,
+                ignore_errors=True,
+                timeout=self.REGISTRY_TIMEOUT,
+            )
+        except subprocess.TimeoutExpired:
+            return ()
+        candidates = []
+        for line in raw_data.splitlines():
+            # e.g. "global flake:nixpkgs github:NixOS/nixpkgs/nixpkgs-unstable"
+            parts = line.split()
+            if len(parts) != 3:
+                continue
+            kind, name, target = parts
+            candidates.append(
+                FlakeCandidate(
+                    name.removeprefix("flake:"),
+                    f"{kind} registry",
+                    target,
+                )
+            )
+        return candidates
+
+
+FLAKE_INDEX = FlakeIndex()
+
+
+@dataclass
+class ClosureCopy:
+    "copies a closure into the store of the target system in parallel batches"
+
+    closure_root: str
+    paths: dict[str, int]
+    "store paths to copy (dependencies first) -> NAR size in bytes"
+    root: Path
+    skipped: int = 0
+    "amount of paths already present in target store"
+
+    BATCH_SIZE = 16
+
+    @staticmethod
+    def plan(closure_root: str, root: Path, skip_present: bool) -> ClosureCopy:
+        closure = query_closure(closure_root)
+        store_dir = root / "nix" / "store"
+        present = (
+            set(os.listdir(store_dir)) if skip_present and store_dir.is_dir() else set()
+        )
+        # nix copy verifies the closure of each path itself,
+        # so skipping present paths is a pure optimization
+        paths = {
+            path: size
+            for path, size in closure.items()
+            if Path(path).name not in present
+        }
+        return ClosureCopy(closure_root, paths, root, skipped=len(closure) - len(paths))
+
+    def cmd(self, paths: Iterable[str]) -> Sequence[str]:
+        return [
+            "nix",
+            "copy",
+            "--extra-experimental-features",
+            "nix-command flakes",
+            "--no-check-sigs",
+            "--to",
+            f"local?root={self.root}",
+            *paths,
+        ]
+
+    @property
+    def batches(self) -> Sequence[Sequence[str]]:
+        paths = list(self.paths)
+        return [
+            paths[i : i + self.BATCH_SIZE]
+            for i in range(0, len(paths), self.BATCH_SIZE)
+        ]
+
+    def execute(self) -> None:
+        progress = TransferProgress(
+            sum(self.paths.values()), len(self.paths), item_name="paths"
+        )
+        print(
+            f"copy {len(self.paths)} paths ({format_size(progress.total_bytes)}) with {CONFIG.copyJobs} jobs, {self.skipped} already present"
+        )
+        if CONFIG.debugMode:
+            call(self.cmd([self.closure_root]))  # only prints in debug mode
+            return
+        with ThreadPoolExecutor(max_workers=CONFIG.copyJobs) as pool:
+            futures = {
+                pool.submit(call_for_info, self.cmd(batch), stderr_suppress=True): batch
+                for batch in self.batches
+            }
+            try:
+                for future in as_completed(futures):
+                    future.result()
+                    batch = futures[future]
+                    progress.advance(sum(self.paths[p] for p in batch), len(batch))
+                    print(f"\r\033[K{progress.line}", end="", flush=True)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+            finally:
+                print()
+
+
+@dataclass(
+    frozen=True,
+)
+class ClosureDiff:
+    "between the system currently active on the target & the system to install"
+
+    current_system: str | None
+    added: dict[str, int]
+    "store path -> NAR size in bytes"
+    removed: dict[str, int]
+    "store path -> NAR size in bytes"
+    unchanged: int
+    "amount of paths in both closures"
+    present: dict[str, int]
+    "added paths already in the target store (e.g. from older generations), so not copied"
+
+    @staticmethod
+    def compare(toplevel: str, root: Path) -> ClosureDiff:
+        new = query_closure(toplevel)
+        current_system = target_system(root)
+        old = (
+            {}
+            if current_system is None
+            else query_closure(current_system, store=f"local?root={root}")
+        )
+        store_dir = root / "nix" / "store"
+        present_names = set(os.listdir(store_dir)) if store_dir.is_dir() else set()
+        added = {p: s for p, s in new.items() if p not in old}
+        return ClosureDiff(
+            current_system=current_system,
+            added=added,
+            removed={p: s for p, s in old.items() if p not in new},
+            unchanged=len(new) - len(added),
+            present={p: s for p, s in added.items() if Path(p).name in present_names},
+        )
+
+    @property
+    def size_delta(self) -> int:
+        "in bytes"
+        return sum(self.added.values()) - sum(self.removed.values())
+
+    @property
+    def preview_sections(self) -> Sequence[str]:
+        if self.current_system is None:
+            return (
+                f"no current system found on target\n(at {MOUNT_POINT}/nix/var/nix/profiles/system)",
+            )
+        to_copy = sum(self.added.values()) - sum(self.present.values())
+        sign = "+" if self.size_delta >= 0 else "-"
+        summary = "\n".join(
+            (
+                f"upgrade from {self.current_system}:",
+                f"added:     {len(self.added)} paths ({format_size(sum(self.added.values()))})",
+                f"removed:   {len(self.removed)} paths ({format_size(sum(self.removed.values()))})",
+                f"unchanged: {self.unchanged} paths",
+                f"size delta: {sign}{format_size(abs(self.size_delta))}",
+                f"to copy:   {len(self.added) - len(self.present)} paths ({format_size(to_copy)}), {len(self.present)} already present",
+            )
+        )
+        return (
+            summary,
+            *(
+                "\n".join(
+                    f"{marker} {store_path_name(p)} ({format_size(size)})"
+                    for p, size in sorted(paths.items(), key=lambda i: -i[1])
+                )
+                for marker, paths in (("+", self.added), ("-", self.removed))
+                if paths
+            ),
+        )
+
+    @staticmethod
+    def preview(future: Future[ClosureDiff] | None) -> Sequence[str]:
+        if future is None:
+            return ("closure diff unavailable, as the system was not built yet",)
+        if not future.done():
+            return ("computing closure diff … (move cursor to refresh)",)
+        error = future.exception()
+        if error is not None:
+            return (f"closure diff failed: {error}",)
+        return future.result().preview_sections
+
+
+CLOSURE_DIFFS: dict[str, Future[ClosureDiff]] = {}
+"by InstallPlan.mount_key & store path of the system to install"
+
+
+def target_system(root: Path) -> str | None:
+    "store path of the active system on the target, resolving its profile links inside root"
+    link = Path("/nix/var/nix/profiles/system")
+    for _ in range(8):  # system -> system-<n>-link -> store path
+        if link.parent == Path("/nix/store"):
+            return str(link)
+        try:
+            target = os.readlink(root / link.relative_to("/"))
+        except OSError:
+            return None
+        link = link.parent / target  # absolute targets replace the parent
+    return None
+
+
+def store_path_name(path: str) -> str:
+    "without hash, e.g. for /nix/store/<hash>-hello-2.12 -> hello-2.12"
+    return Path(path).name.partition("-")[2]
+
+
+def unmount_target() -> None:
+    "unmounts the disks at MOUNT_POINT, incl. those kept mounted by InstallMode.ENTER"
+    MOUNTED_MARKER.unlink(missing_ok=True)
+    if os.path.ismount(MOUNT_POINT):
+        call(["umount", "--recursive", str(MOUNT_POINT)])
+
+
+def discard_disks(disk_map: Mapping[DiskName, DiskPath]) -> None:
+    "discards all blocks of the given disks in parallel, after checking all of them"
+    paths = set(disk_map.values())
+    whole_disks = {Path(disk.path).resolve() for disk in DiskInfo.list_all()}
+    for path in paths:
+        device = Path(path).resolve()
+        if device.is_block_device() and device not in whole_disks:
+            # e.g. a partition entered manually
+            raise StageRefused(
+                f"refusing to discard {path!r}, not a whole disk: {device}"
+            )
+    with ThreadPoolExecutor(max_workers=max(len(paths), 1)) as pool:
+        futures = [pool.submit(discard_disk, path) for path in paths]
+        for future in as_completed(futures):
+            print(f"[{APP_NAME}] {future.result()}")
+
+
+def discard_disk(path: DiskPath) -> str:
+    "returns a report for the user"
+    device = Path(path).resolve()
+    if not device.is_block_device():
+        return f"skipped {path} (not a block device)"
+    discard_max = Path(f"/sys/class/block/{device.name}/queue/discard_max_bytes")
+    if not discard_max.is_file() or int(discard_max.read_text()) == 0:
+        return f"skipped {path} (discard not supported)"
+    start = time.monotonic()
+    # without --force, blkdiscard refuses devices still in use,
+    # without a TTY, it only warns about existing signatures instead of refusing
+    call(["blkdiscard", str(device)], stdin=subprocess.DEVNULL)
+    return f"discarded {path} in {format_duration(time.monotonic() - start)}"
+
+
+def query_closure(path: str, store: str | None = None) -> dict[str, int]:
+    "returns all paths in the closure (dependencies first) -> NAR size in bytes"
+    raw_data = call_for_info(
+        [
+            "nix",
+            "path-info",
+            "--extra-experimental-features",
+            "nix-command flakes",
+            "--json",
+            "--recursive",
+            *(() if store is None else ("--store", store)),
+            path,
+        ],
+        stderr_suppress=True,
+    )
+    json_data = json.loads(raw_data)
+    # format changed from list to dict with Nix 2.19
+    infos: Iterable[tuple[str, dict[str, Any]]] = (
+        json_data.items()
+        if isinstance(json_data, dict)
+        else ((i["path"], i) for i in json_data)
+    )
+    sizes: dict[str, int] = {}
+    graph = TopologicalSorter[str]()
+    for store_path, info in infos:
+        sizes[store_path] = info["narSize"]
+        graph.add(store_path, *(r for r in info["references"] if r != store_path))
+    return {p: sizes[p] for p in graph.static_order()}
+
+
+class CompletionAction(Enum):
+    SHUTDOWN = auto()
+    REBOOT = auto()
+    FIRMWARE = auto()
+    MENU = auto()
+
+    @property
+    def cmd(self) -> Sequence[str] | None:
+        match self:
+            case CompletionAction.SHUTDOWN:
+                return ["systemctl", "poweroff"]
             case CompletionAction.REBOOT:
                 return ["systemctl", "reboot"]
             case CompletionAction.FIRMWARE:
@@ -738,18 +2221,28 @@ class InstallMode(Enum):
     UPGRADE = auto()
 
     @property
-    def utilizes_prebuild(self) -> bool:
-        return self != InstallMode.ENTER
+    def wipes_disks(self) -> bool:
+        return self == InstallMode.INSTALL
 
     @property
-    def disko_args(self) -> Sequence[str]:
+    def reuses_target_store(self) -> bool:
+        "whether the target may already contain parts of the system closure"
+        return self == InstallMode.UPGRADE
+
+    @property
+    def stages(self) -> Sequence[InstallStage]:
         match self:
             case InstallMode.ENTER:
-                raise NotImplementedError("InstallMode.ENTER not supported yet")
+                # disks stay mounted for later visits, see unmount_target()
+                return (InstallStage.RESOLVE, InstallStage.BUILD, InstallStage.MOUNT)
             case InstallMode.INSTALL:
-                return ("--mode", "format")
+                return tuple(InstallStage)
             case InstallMode.UPGRADE:
-                return ("--mode", "mount")
+                return tuple(
+                    s
+                    for s in InstallStage
+                    if s not in {InstallStage.DISCARD, InstallStage.FORMAT}
+                )
         assert_never()
 
     @property
@@ -775,6 +2268,54 @@ class InstallMode(Enum):
         raise RuntimeError(f"unknown InstallMode: {name!r}")
 
 
+class InstallStage(Enum):
+    "in order of execution"
+
+    RESOLVE = auto()
+    BUILD = auto()
+    DISCARD = auto()
+    FORMAT = auto()
+    MOUNT = auto()
+    COPY = auto()
+    BOOTLOADER = auto()
+    FINALIZE = auto()
+
+    @property
+    def title(self) -> str:
+        match self:
+            case InstallStage.RESOLVE:
+                return "resolve flake"
+            case InstallStage.BUILD:
+                return "build system & disko scripts"
+            case InstallStage.DISCARD:
+                return "discard disk blocks"
+            case InstallStage.FORMAT:
+                return "partition & format disks"
+            case InstallStage.MOUNT:
+                return "mount disks"
+            case InstallStage.COPY:
+                return "copy system closure"
+            case InstallStage.BOOTLOADER:
+                return "install bootloader"
+            case InstallStage.FINALIZE:
+                return "finalize"
+        assert_never()
+
+    @property
+    def modifies_target(self) -> bool:
+        "whether the disks or the system on them are changed"
+        return self not in {
+            InstallStage.RESOLVE,
+            InstallStage.BUILD,
+            InstallStage.MOUNT,
+        }
+
+    @property
+    def always_repeat(self) -> bool:
+        "mounts may have been lost since previous attempt, so remounting is cheap insurance"
+        return self == InstallStage.MOUNT
+
+
 @dataclass(
     frozen=True,
 )
@@ -783,22 +2324,67 @@ class ConfigSource:
     host: str
 
     def list_disko_disks(self) -> Sequence[DiskName]:
+        return FLAKE_REGISTRY.host_fact(self, "disko_disks", self.eval_disko_disks)
+
+    def eval_disko_disks(self) -> Sequence[DiskName]:
         raw_data = self.eval(
             attribute="config.disko.devices.disk",
             apply="a: with builtins; toJSON (attrNames a)",
         )
         return json.loads(raw_data)
 
-    @cached_property
+    @property
+    def disko_min_sizes(self) -> Mapping[DiskName, int]:
+        "minimal size in bytes of each disko disk, as far as its partitions declare sizes"
+        try:
+            return FLAKE_REGISTRY.host_fact(
+                self, "disko_min_sizes", self.eval_disko_min_sizes
+            )
+        except subprocess.CalledProcessError:
+            return {}  # preflight checks are optional
+
+    def eval_disko_min_sizes(self) -> Mapping[DiskName, int]:
+        raw_data = self.eval(
+            attribute="config.disko.devices.disk",
+            apply="""disks: with builtins; toJSON (mapAttrs (_: d:
+              let ps = if isAttrs d.content && d.content ? partitions then d.content.partitions else [ ];
+              in map (p: p.size or null) (if isAttrs ps then attrValues ps else ps)
+            ) disks)""",
+        )
+        return {
+            name: disko_min_disk_size(sizes)
+            for name, sizes in json.loads(raw_data).items()
+        }
+
+    @property
     def host_preview(self) -> str:
-        systemDesc = self.get_option_or_none("system.description")
+        return FLAKE_REGISTRY.host_preview(self)
+
+    def render_host_preview(self, timeout: float | None = None) -> str:
+        """evaluates the config, use host_preview to reuse results
+
+        timeout in seconds for all evaluations together,
+        errors are not printed, as previews are rendered in the background
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        systemDesc = self.get_option_or_none(
+            "system.description", timeout=timeout, quiet=True
+        )
         if systemDesc is not None:
             return str(systemDesc)
         with Path(HOST_PREVIEW_NIX).open("r") as fd:
             preview_gen = fd.read()
-        return self.eval(apply=preview_gen).rstrip("\r\n")
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+        return self.eval(apply=preview_gen, timeout=remaining, quiet=True).rstrip(
+            "\r\n"
+        )
 
-    def get_option_or_none(self, option: str) -> Any:
+    def get_option_or_none(
+        self,
+        option: str,
+        timeout: float | None = None,
+        quiet: bool = False,
+    ) -> Any:
         """
         - requires the option value to be generally JSON compatible
         - only ignores when the last attribute ceases to exist
@@ -807,6 +2393,8 @@ class ConfigSource:
             self.eval(
                 "config",
                 apply=f"c: builtins.toJSON (c.{option} or null)",
+                timeout=timeout,
+                quiet=quiet,
             )
         )
 
@@ -814,7 +2402,14 @@ class ConfigSource:
         "requires the option value to be generally JSON compatible"
         return json.loads(self.eval(f"config.{option}", "builtins.toJSON"))
 
-    def eval(self, attribute: str | None = None, apply: str | None = None) -> str:
+    def eval(
+        self,
+        attribute: str | None = None,
+        apply: str | None = None,
+        timeout: float | None = None,
+        quiet: bool = False,
+    ) -> str:
+        NETWORK.require(self.flake.reference)
         args = [
             "nix",
             "eval",
@@ -825,16 +2420,23 @@ class ConfigSource:
         ]
         if apply is not None:
             args.extend(("--apply", apply))
-        return call_for_info(args, stderr_suppress=True)
+        return call_for_info(args, stderr_suppress=True, timeout=timeout, quiet=quiet)
 
     @property
     def flake_spec(self) -> str:
-        return f'{self.flake.reference}#nixosConfigurations."{self.host}"'
+        "locked, so cached facts belong to the revision they are exported with"
+        locked = FLAKE_REGISTRY.locked_reference(self.flake)
+        return f'{locked}#nixosConfigurations."{self.host}"'
 
     @property
     def short_spec(self) -> str:
         return f"{self.flake.reference}#{self.host}"
 
+    @property
+    def locked_spec(self) -> str:
+        "like short_spec, but locked once per flake, see FlakeRegistry.locked_reference"
+        return f"{FLAKE_REGISTRY.locked_reference(self.flake)}#{self.host}"
+
 
 DiskName = NewType("DiskName", str)
 "name of disk in a disko config"
@@ -850,6 +2452,9 @@ class DiskInfo:
     model: str
     serial: str
     wwn: str
+    rotational: bool
+    logical_block_size: int
+    physical_block_size: int
 
     @staticmethod
     def list_all() -> Iterable[DiskInfo]:
@@ -870,16 +2475,46 @@ class DiskInfo:
                     model=disk_data["model"],
                     serial=disk_data["serial"],
                     wwn=disk_data["wwn"],
+                    # older lsblk versions output strings instead
+                    rotational=str(disk_data["rota"]).lower() in {"1", "true"},
+                    logical_block_size=int(disk_data["log-sec"]),
+                    physical_block_size=int(disk_data["phy-sec"]),
                 )
 
-    def preview_disk(self) -> str:
-        return "".join(
-            (
-                call_for_info(["fdisk", "--list", self.path], ignore_errors=True),
-                "\n",  # empty line as separation
-                call_for_info(["lsblk", "--fs", self.path], ignore_errors=True),
-                call_for_info(["smartctl", "--info", self.path], ignore_errors=True),
+    @property
+    def size_bytes(self) -> int:
+        sectors = Path(f"/sys/class/block/{self.name}/size").read_text()
+        return int(sectors) * 512  # always in 512-byte sectors
+
+    def benchmark(self) -> Future[DiskBenchmark]:
+        "started in background once per disk & session"
+        key = self.serial or self.path
+        if key not in DISK_BENCHMARKS:
+            DISK_BENCHMARKS[key] = BENCHMARK_POOL.submit(DiskBenchmark.run, self.path)
+        return DISK_BENCHMARKS[key]
+
+    def preflight(self, required_size: int | None) -> DiskCheck:
+        "checks whether this disk is suitable for a disko disk"
+        problems = []
+        if required_size is not None and self.size_bytes < required_size:
+            problems.append(
+                f"too small, layout requires at least {format_size(required_size)}"
             )
+        warnings = []
+        if self.rotational:
+            warnings.append("rotational drive, installation & system will be slow")
+        if self.logical_block_size != self.physical_block_size:
+            warnings.append(
+                f"logical block size ({self.logical_block_size} B) differs from physical block size ({self.physical_block_size} B)"
+            )
+        return DiskCheck(tuple(problems), tuple(warnings))
+
+    def preview_disk(self) -> Sequence[str]:
+        "sections of the preview, see SimpleMenuOption.description"
+        return (
+            call_for_info(["fdisk", "--list", self.path], ignore_errors=True),
+            call_for_info(["lsblk", "--fs", self.path], ignore_errors=True),
+            call_for_info(["smartctl", "--info", self.path], ignore_errors=True),
         )
 
     # cannot be @property, as unsupported on classmethod/staticmethod (according to mypy)
@@ -896,6 +2531,145 @@ class DiskInfo:
         return DiskPath(f"/dev/{self.name}")
 
 
+@dataclass(frozen=True)
+class DiskCheck:
+    problems: Sequence[str] = ()
+    "make a disk incompatible"
+    warnings: Sequence[str] = ()
+
+    @property
+    def compatible(self) -> bool:
+        return not self.problems
+
+    @property
+    def marker(self) -> str:
+        "prefix for disk descriptions"
+        if self.problems:
+            return "✗ "
+        if self.warnings:
+            return "⚠ "
+        return ""
+
+    @property
+    def preview(self) -> str:
+        if not self.problems and not self.warnings:
+            return "✓ passed preflight checks"
+        return "\n".join(
+            (
+                *(f"✗ {problem} (cannot be selected)" for problem in self.problems),
+                *(f"⚠ {warning}" for warning in self.warnings),
+            )
+        )
+
+
+@dataclass(frozen=True)
+class DiskBenchmark:
+    "results of a short, read-only benchmark"
+
+    sequential_throughput: float
+    "in bytes per second"
+    random_iops: float
+    random_latency: float
+    "average, in seconds"
+
+    DURATION = 1.5
+    "in seconds, per access pattern"
+    SEQUENTIAL_BLOCK = 1024**2
+    RANDOM_BLOCK = 4096
+
+    @staticmethod
+    def run(path: DiskPath) -> DiskBenchmark:
+        # O_DIRECT bypasses the page cache, so repeated runs measure the disk
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECT)
+        try:
+            size = os.lseek(fd, 0, os.SEEK_END)
+            # mmap returns page-aligned memory, as required by O_DIRECT
+            with mmap.mmap(-1, DiskBenchmark.SEQUENTIAL_BLOCK) as buffer:
+                sequential = DiskBenchmark.__read_sequential(fd, size, buffer)
+                random_reads, random_duration = DiskBenchmark.__read_random(
+                    fd, size, memoryview(buffer)[: DiskBenchmark.RANDOM_BLOCK]
+                )
+        finally:
+            os.close(fd)
+        return DiskBenchmark(
+            sequential_throughput=sequential,
+            random_iops=random_reads / random_duration,
+            random_latency=random_duration / max(random_reads, 1),
+        )
+
+    @staticmethod
+    def __read_sequential(fd: int, size: int, buffer: mmap.mmap) -> float:
+        "returns bytes per second"
+        read = 0
+        start = time.monotonic()
+        while time.monotonic() - start < DiskBenchmark.DURATION:
+            if read + DiskBenchmark.SEQUENTIAL_BLOCK > size:
+                break
+            read += os.preadv(fd, [buffer], read)
+        return read / (time.monotonic() - start)
+
+    @staticmethod
+    def __read_random(fd: int, size: int, buffer: memoryview) -> tuple[int, float]:
+        "returns amount of reads & their duration in seconds"
+        blocks = size // DiskBenchmark.RANDOM_BLOCK
+        reads = 0
+        start = time.monotonic()
+        while time.monotonic() - start < DiskBenchmark.DURATION and blocks > 0:
+            offset = random.randrange(blocks) * DiskBenchmark.RANDOM_BLOCK
+            os.preadv(fd, [buffer], offset)
+            reads += 1
+        return reads, time.monotonic() - start
+
+    @staticmethod
+    def preview(future: Future[DiskBenchmark]) -> str:
+        if not future.running() and not future.done():
+            return "benchmark queued, disks are measured one after another … (move cursor to refresh)"
+        if not future.done():
+            return "benchmark running … (move cursor to refresh)"
+        error = future.exception()
+        if error is not None:
+            return f"benchmark failed: {error}"
+        result = future.result()
+        return "\n".join(
+            (
+                "read-only benchmark:",
+                f"sequential:  {format_size(result.sequential_throughput)}/s",
+                f"random 4K:   {result.random_iops:.0f} IOPS, {result.random_latency * 1000:.2f} ms average latency",
+            )
+        )
+
+
+DISK_BENCHMARKS: dict[str, Future[DiskBenchmark]] = {}
+"by serial of the disk"
+BENCHMARK_POOL = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix=f"{APP_NAME}-benchmark"
+)
+"one disk after another, as disks on the same controller would skew each other"
+
+
+DISKO_ALIGNMENT = 1024**2
+"in bytes, used by disko/sgdisk for aligning partitions"
+
+
+def disko_min_disk_size(sizes: Sequence[str | int | None]) -> int:
+    "in bytes, from the sizes of the disk's partitions"
+    overhead = DISKO_ALIGNMENT * (len(sizes) + 2)  # alignment & partition tables
+    return overhead + sum(parse_disko_size(size) for size in sizes)
+
+
+def parse_disko_size(size: str | int | None) -> int:
+    "in bytes, 0 for sizes relative to the disk (e.g. 100%) or unknown ones"
+    if isinstance(size, int):
+        return size
+    if size is None:
+        return 0
+    match = re.fullmatch(r"\s*([0-9]+)\s*([KMGTP]?)(i?B)?\s*", size, re.IGNORECASE)
+    if match is None:
+        return 0
+    exponent = " KMGTP".index(match[2].upper() or " ")
+    return int(match[1]) * 1024**exponent  # sgdisk uses binary units
+
+
 def fqdn_sorted(i: Iterable[str]) -> list[str]:
     return sorted(i, key=fqdn_key)
 
@@ -910,12 +2684,20 @@ def call_for_info(
     cmd: Sequence[str],
     stderr_suppress: bool = False,
     ignore_errors: bool = False,
+    timeout: float | None = None,
+    quiet: bool = False,
 ) -> str:
+    """
+    - raises subprocess.TimeoutExpired after timeout (in seconds), even if ignore_errors
+    - quiet & stderr_suppress: stderr is not printed on errors either,
+      only kept on the raised CalledProcessError
+    """
     proc = subprocess.run(
         ["/usr/bin/env"] + list(cmd),
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE if stderr_suppress else None,
         text=True,
+        timeout=timeout,
     )
     if ignore_errors:
         return (
@@ -923,7 +2705,7 @@ def call_for_info(
             if stderr_suppress
             else "\n".join(t for t in (proc.stdout, proc.stderr) if t)
         )
-    if stderr_suppress and proc.returncode != 0:
+    if stderr_suppress and not quiet and proc.returncode != 0:
         print(proc.stderr, file=sys.stderr)
     proc.check_returncode()
     return proc.stdout
@@ -933,6 +2715,7 @@ def call(
     cmd: Sequence[str] | str | None,
     safe: bool = False,
     echo: bool = True,
+    stdin: int | None = None,
 ) -> None:
     if cmd is None:
         return None
@@ -947,12 +2730,568 @@ def call(
         return
     if echo:
         print("+ " + shlex.join(cmd))
-    subprocess.check_call(["/usr/bin/env"] + cmd)
+    subprocess.check_call(["/usr/bin/env"] + cmd, stdin=stdin)
 
 
 P = ParamSpec("P")
 
 
+# === network reachability
+
+
+class NetworkUnreachable(RuntimeError):
+    "raised instead of waiting for nix to run into its own network timeouts"
+
+
+class StageRefused(RuntimeError):
+    "raised by an install stage refusing to run with its inputs, before changing anything"
+
+
+@dataclass(
+    frozen=True,
+)
+class Endpoint:
+    host: str
+    port: int
+
+    FORGES = {
+        "github": "github.com",
+        "gitlab": "gitlab.com",
+        "sourcehut": "git.sr.ht",
+    }
+    "flake reference schemes -> their default host"
+    PORTS = {
+        "http": 80,
+        "https": 443,
+        "ssh": 22,
+    }
+
+    def __str__(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    @staticmethod
+    def of_flake(reference: str) -> Sequence[Endpoint]:
+        "empty for local references & for ones which cannot be resolved here, e.g. indirect ones"
+        scheme, _, rest = reference.partition(":")
+        if scheme in Endpoint.FORGES:
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(rest).query)
+            host = query.get("host", [Endpoint.FORGES[scheme]])[0]
+            return (Endpoint(host, 443),)
+        endpoint = Endpoint.from_url(reference)
+        return () if endpoint is None else (endpoint,)
+
+    @staticmethod
+    def from_url(url: str) -> Endpoint | None:
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.rpartition("+")[2]  # e.g. git+https
+        port = Endpoint.PORTS.get(scheme)
+        if port is None or not parts.hostname:
+            return None
+        return Endpoint(parts.hostname, parts.port or port)
+
+    def probe(self) -> EndpointStatus:
+        checked_at = time.monotonic()
+        try:
+            socket.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+        except OSError as e:
+            return EndpointStatus(self, checked_at, f"DNS lookup failed: {e}")
+        try:
+            with socket.create_connection(
+                (self.host, self.port), timeout=NetworkProbe.TIMEOUT
+            ):
+                pass
+        except OSError as e:
+            return EndpointStatus(self, checked_at, f"TCP connection failed: {e}")
+        return EndpointStatus(self, checked_at)
+
+
+@dataclass(
+    frozen=True,
+)
+class EndpointStatus:
+    endpoint: Endpoint
+    checked_at: float
+    "time.monotonic()"
+    problem: str | None = None
+
+    @property
+    def line(self) -> str:
+        if self.problem is None:
+            return f"✓ {self.endpoint}"
+        return f"✗ {self.endpoint}: {self.problem}"
+
+
+class NetworkProbe:
+    """
+    probes endpoints in the background & refreshes outdated results on access,
+    so network dependent actions can fail fast instead of stalling the menu
+    """
+
+    TIMEOUT = 3.0
+    "in seconds, for connecting & for waiting on pending probes"
+    REFRESH_INTERVAL = 30.0
+    "in seconds"
+
+    def __init__(self) -> None:
+        self.__lock = Lock()
+        self.__latest: dict[Endpoint, EndpointStatus] = {}
+        self.__pending: dict[Endpoint, Future[EndpointStatus]] = {}
+
+    def start(self, endpoints: Iterable[Endpoint]) -> None:
+        for endpoint in endpoints:
+            self.__schedule(endpoint)
+
+    def status(self, endpoint: Endpoint, wait: bool = False) -> EndpointStatus | None:
+        """None while the first probe is still running (& did not finish in time when waiting)
+
+        when waiting, failed results are probed again,
+        e.g. so fixing the network in a shell takes effect immediately
+        """
+        future = self.__schedule(endpoint, refresh_failed=wait)
+        with self.__lock:
+            latest = self.__latest.get(endpoint)
+        if (
+            not wait
+            or future is None
+            or (latest is not None and latest.problem is None)
+        ):
+            return latest
+        try:
+            return future.result(timeout=self.TIMEOUT)
+        except TimeoutError:
+            return latest or EndpointStatus(
+                endpoint,
+                time.monotonic(),
+                f"no answer within {format_duration(self.TIMEOUT)}",
+            )
+
+    def problem(self, reference: str, wait: bool = False) -> str | None:
+        "of the endpoints required by a flake reference, None if reachable or unknown"
+        for endpoint in Endpoint.of_flake(reference):
+            status = self.status(endpoint, wait=wait)
+            if status is not None and status.problem is not None:
+                return status.line
+        return None
+
+    def require(self, reference: str) -> None:
+        problem = self.problem(reference, wait=True)
+        if problem is not None:
+            raise NetworkUnreachable(f"cannot reach {reference}:\n{problem}")
+
+    def preview(self, endpoints: Iterable[Endpoint]) -> str:
+        lines = []
+        for endpoint in endpoints:
+            status = self.status(endpoint)
+            lines.append(f"… {endpoint}" if status is None else status.line)
+        return "\n".join(lines)
+
+    def refresh(self) -> None:
+        "forgets all results, e.g. after the network was fixed"
+        with self.__lock:
+            self.__latest.clear()
+
+    def __schedule(
+        self,
+        endpoint: Endpoint,
+        refresh_failed: bool = False,
+    ) -> Future[EndpointStatus] | None:
+        "returns the pending probe, None if the latest result is still fresh"
+        with self.__lock:
+            future = self.__pending.get(endpoint)
+            if future is not None:
+                return future
+            latest = self.__latest.get(endpoint)
+            if (
+                latest is not None
+                and (latest.problem is None or not refresh_failed)
+                and time.monotonic() - latest.checked_at < self.REFRESH_INTERVAL
+            ):
+                return None
+            future = self.__pending[endpoint] = BACKGROUND_POOL.submit(endpoint.probe)
+        future.add_done_callback(lambda f: self.__finish(endpoint, f))
+        return future
+
+    def __finish(self, endpoint: Endpoint, future: Future[EndpointStatus]) -> None:
+        with self.__lock:
+            self.__latest[endpoint] = future.result()
+            del self.__pending[endpoint]
+
+
+NETWORK = NetworkProbe()
+
+
+def network_endpoints() -> list[Endpoint]:
+    "all endpoints the configured flakes & substituters depend on"
+    endpoints = list(Endpoint.of_flake(CONFIG.defaultFlake))
+    for flake in CONFIG.listedFlakes:
+        endpoints.extend(Endpoint.of_flake(flake.reference))
+    endpoints.extend(substituter_endpoints())
+    return list(dict.fromkeys(endpoints))
+
+
+def substituter_endpoints() -> list[Endpoint]:
+    substituters = (DEFAULT_SUBSTITUTER, *CONFIG.extraSubstituters)
+    endpoints = (Endpoint.from_url(url) for url in substituters)
+    return list(dict.fromkeys(e for e in endpoints if e is not None))
+
+
+# === nix log processing
+
+
+def call_with_build_status(cmd: Sequence[str]) -> None:
+    """executes a nix command using --log-format internal-json
+
+    and displays a compact status line instead of its log
+    """
+    print("+ " + shlex.join(cmd))
+    proc = subprocess.Popen(
+        ["/usr/bin/env", *cmd],
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    assert proc.stderr is not None
+    width = shutil.get_terminal_size().columns
+    status = BuildStatus()
+    last_render = 0.0
+    last_report = 0.0
+    for _ in status.consume(parse_nix_log(proc.stderr)):
+        now = time.monotonic()
+        if now - last_render >= BuildStatus.RENDER_INTERVAL:
+            print(f"\r\033[K{status.line[:width]}", end="", flush=True)
+            last_render = now
+        if now - last_report >= StatusReporter.BATCH_INTERVAL:
+            status.report()
+            last_report = now
+    print(f"\r\033[K{status.line[:width]}")
+    status.report()
+    if proc.wait() != 0:
+        print("\n".join(status.recent_lines), file=sys.stderr)
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+
+def parse_nix_log(lines: Iterable[str]) -> Iterator[dict[str, Any]]:
+    "yields the events of a log in nix's internal-json format, other lines as messages"
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line.startswith("@nix "):
+            try:
+                yield json.loads(line[5:])
+                continue
+            except json.JSONDecodeError:
+                pass
+        yield {"action": "msg", "level": 0, "msg": line}
+
+
+class NixActivity(IntEnum):
+    "subset of nix's ActivityType"
+
+    FILE_TRANSFER = 101
+    COPY_PATHS = 103
+    BUILDS = 104
+    BUILD = 105
+    SUBSTITUTE = 108
+    FETCH_TREE = 112
+
+
+class NixResult(IntEnum):
+    "subset of nix's ResultType"
+
+    BUILD_LOG_LINE = 101
+    PROGRESS = 105
+
+
+@dataclass
+class BuildStatus:
+    """aggregates the events of a nix log
+
+    only keeps data about running activities & a bounded amount of log lines,
+    so memory usage does not grow with the size of the log
+    """
+
+    builds_done: int = 0
+    builds_expected: int = 0
+    paths_done: int = 0
+    paths_expected: int = 0
+    finished_transfers: int = 0
+    "in bytes"
+    running: dict[int, NixActivity] = field(default_factory=dict)
+    running_transfers: dict[int, int] = field(default_factory=dict)
+    "id -> transferred bytes"
+    running_texts: dict[int, str] = field(default_factory=dict)
+    "id -> description, of activities worth showing to the user"
+    recent_lines: deque[str] = field(
+        default_factory=lambda: deque(maxlen=BuildStatus.RECENT_LINES)
+    )
+
+    RECENT_LINES = 50
+    "kept to be shown on failure"
+    RENDER_INTERVAL = 0.2
+    "in seconds"
+
+    def consume(self, events: Iterable[dict[str, Any]]) -> Iterator[BuildStatus]:
+        for event in events:
+            self.update(event)
+            yield self
+
+    def update(self, event: dict[str, Any]) -> None:
+        match event.get("action"):
+            case "msg":
+                self.recent_lines.append(event.get("msg", ""))
+            case "start":
+                self.__start(event["id"], event.get("type", 0), event.get("text", ""))
+            case "stop":
+                activity_id = event["id"]
+                self.running.pop(activity_id, None)
+                self.running_texts.pop(activity_id, None)
+                self.finished_transfers += self.running_transfers.pop(activity_id, 0)
+            case "result":
+                self.__result(
+                    event["id"], event.get("type", 0), event.get("fields", [])
+                )
+
+    def __start(self, activity_id: int, activity_type: int, text: str) -> None:
+        try:
+            activity = NixActivity(activity_type)
+        except ValueError:
+            return
+        self.running[activity_id] = activity
+        if activity == NixActivity.FILE_TRANSFER:
+            self.running_transfers[activity_id] = 0
+        if activity in {
+            NixActivity.BUILD,
+            NixActivity.SUBSTITUTE,
+            NixActivity.FETCH_TREE,
+        }:
+            self.running_texts[activity_id] = text
+
+    def __result(self, activity_id: int, result_type: int, fields: list[Any]) -> None:
+        if result_type == NixResult.BUILD_LOG_LINE and fields:
+            self.recent_lines.append(str(fields[0]))
+            return
+        if result_type != NixResult.PROGRESS or len(fields) < 2:
+            return
+        done, expected = fields[0], fields[1]
+        match self.running.get(activity_id):
+            case NixActivity.BUILDS:
+                self.builds_done, self.builds_expected = done, expected
+            case NixActivity.COPY_PATHS:
+                self.paths_done, self.paths_expected = done, expected
+            case NixActivity.FILE_TRANSFER:
+                self.running_transfers[activity_id] = done
+
+    @property
+    def downloaded(self) -> int:
+        "in bytes"
+        return self.finished_transfers + sum(self.running_transfers.values())
+
+    @property
+    def current_activity(self) -> str | None:
+        return next(reversed(self.running_texts.values()), None)
+
+    @property
+    def line(self) -> str:
+        return " - ".join(
+            part
+            for part in (
+                f"built {self.builds_done}/{self.builds_expected}",
+                f"fetched {self.paths_done}/{self.paths_expected}",
+                f"{format_size(self.downloaded)} downloaded",
+                self.current_activity,
+            )
+            if part
+        )
+
+    def report(self) -> None:
+        STATUS.emit(
+            "build",
+            builds_done=self.builds_done,
+            builds_expected=self.builds_expected,
+            paths_done=self.paths_done,
+            paths_expected=self.paths_expected,
+            downloaded=self.downloaded,
+        )
+
+
+# === status reporting
+
+
+class StatusReporter:
+    """sends events about this installer to a collector, see --status-aggregator
+
+    events are queued & sent in batches by a background thread,
+    so a slow or missing collector never blocks the menu or an installation
+    """
+
+    BATCH_INTERVAL = 1.0
+    "in seconds"
+    BATCH_SIZE = 50
+    "events per datagram / request"
+    MAX_QUEUED = 1000
+    "beyond that, the oldest events are dropped"
+    TIMEOUT = 2.0
+    "in seconds, for HTTP requests"
+
+    def __init__(self) -> None:
+        self.__queue: deque[dict[str, Any]] = deque(maxlen=self.MAX_QUEUED)
+        self.__collector: urllib.parse.SplitResult | None = None
+        self.installer = socket.gethostname()
+
+    def start(self, collector: str) -> None:
+        url = urllib.parse.urlsplit(collector)
+        if url.scheme not in {"udp", "http", "https"} or url.hostname is None:
+            raise RuntimeError(f"unsupported statusCollector: {collector!r}")
+        self.__collector = url
+        Thread(target=self.__send_loop, daemon=True).start()
+
+    def emit(self, event: str, **data: Any) -> None:
+        "does nothing if no collector is configured"
+        if self.__collector is None:
+            return
+        self.__queue.append(  # thread-safe
+            {"installer": self.installer, "time": time.time(), "event": event, **data}
+        )
+
+    def __send_loop(self) -> None:
+        while True:
+            time.sleep(self.BATCH_INTERVAL)
+            while self.__queue:
+                batch = [
+                    self.__queue.popleft()
+                    for _ in range(min(len(self.__queue), self.BATCH_SIZE))
+                ]
+                try:
+                    self.__send(json.dumps(batch).encode())
+                except OSError:
+                    break  # collector unavailable, so drop this batch & retry later
+
+    def __send(self, payload: bytes) -> None:
+        url = self.__collector
+        assert url is not None and url.hostname is not None
+        if url.scheme == "udp":
+            family, type, proto, _, address = socket.getaddrinfo(
+                url.hostname, url.port, type=socket.SOCK_DGRAM
+            )[0]
+            with socket.socket(family, type, proto) as sock:
+                sock.sendto(payload, address)
+            return
+        request = urllib.request.Request(
+            url.geturl(),
+            data=payload,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.TIMEOUT):
+            pass
+
+
+STATUS = StatusReporter()
+
+
+def aggregate_status(address: str) -> NoReturn:
+    "handler for --status-aggregator, shows the latest status of each installer as table"
+    url = urllib.parse.urlsplit(address)
+    if url.port is None:
+        raise RuntimeError(f"missing port in status aggregator address: {address!r}")
+    rows: dict[str, dict[str, Any]] = {}
+    lock = Lock()
+
+    def receive(payload: bytes) -> None:
+        try:
+            batch = json.loads(payload)
+        except ValueError:
+            return
+        if not isinstance(batch, list):
+            return
+        for event in batch:
+            # skip malformed events, e.g. stray datagrams or from other versions
+            try:
+                installer = str(event["installer"])
+                seen = float(event["time"])
+                summary = summarize_status_event(event)
+            except (KeyError, TypeError, ValueError):
+                continue
+            with lock:
+                row = rows.setdefault(installer, {})
+                row.update(summary)
+                row["seen"] = seen
+
+    if url.scheme == "udp":
+        sock = socket.socket(
+            socket.AF_INET6 if ":" in (url.hostname or "") else socket.AF_INET,
+            socket.SOCK_DGRAM,
+        )
+        sock.bind((url.hostname or "", url.port))
+
+        def serve_udp() -> None:
+            while True:
+                receive(sock.recv(65535))
+
+        Thread(target=serve_udp, daemon=True).start()
+    elif url.scheme == "http":
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                receive(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass  # would garble the table
+
+        server = ThreadingHTTPServer((url.hostname or "", url.port), Handler)
+        Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        raise RuntimeError(f"unsupported status aggregator address: {address!r}")
+    while True:
+        with lock:
+            table = render_status_table(rows)
+        print(f"\033[H\033[2J{table}", flush=True)
+        time.sleep(1)
+
+
+def summarize_status_event(event: dict[str, Any]) -> dict[str, str]:
+    "columns of the status table updated by the event"
+    match event["event"]:
+        case "menu":
+            return {"menu": event["menu"]}
+        case "stage":
+            summary = {"stage": f"{event['stage']} ({event['state']})"}
+            if event.get("error"):
+                summary["error"] = event["error"]
+            if event["state"] == "started":
+                summary["error"] = ""
+            return summary
+        case "build":
+            return {
+                "build": f"built {event['builds_done']}/{event['builds_expected']}, fetched {event['paths_done']}/{event['paths_expected']}, {format_size(event['downloaded'])}"
+            }
+        case "install":
+            return {"stage": f"installation {event['state']}", "build": ""}
+    return {}
+
+
+STATUS_COLUMNS = ("installer", "menu", "stage", "build", "error", "seen")
+
+
+def render_status_table(rows: Mapping[str, dict[str, Any]]) -> str:
+    now = time.time()
+    lines = [
+        [
+            name,
+            *(str(row.get(c, "")) for c in STATUS_COLUMNS[1:-1]),
+            f"{format_duration(now - row['seen'])} ago",
+        ]
+        for name, row in sorted(rows.items())
+    ]
+    table = [list(c.upper() for c in STATUS_COLUMNS), *lines]
+    widths = [max(len(line[i]) for line in table) for i in range(len(STATUS_COLUMNS))]
+    columns = shutil.get_terminal_size().columns
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(line, widths))[:columns]
+        for line in table
+    )
+
+
 # === menu rendering
 
 
@@ -975,19 +3314,45 @@ class MenuSelection:
         )
 
     def show_selection(self) -> MenuOption | None:
-        with MenuSelection.__preview_listener(self) as cmd:
+        returncode, stdout = self.__run_fzf()
+        if returncode in {1, 130}:
+            return None
+        return self.__lookup(stdout.rstrip("\r\n"))
+
+    def show_query_selection(self) -> MenuOption | str | None:
+        "returns the typed query instead if it matches no option or ALT+ENTER was pressed"
+        returncode, stdout = self.__run_fzf("--print-query", "--expect=alt-enter")
+        if returncode == 130:
+            return None
+        # output: query, key pressed (empty for ENTER), selection (if any matched)
+        query, key, name, *_ = [*stdout.splitlines(), "", "", ""]
+        if key == "alt-enter" or name == "":
+            return query
+        return self.__lookup(name)
+
+    def __lookup(self, name: str) -> MenuOption:
+        selection = self.options.get(name)
+        if selection is None:
+            raise RuntimeError(
+                f"should not happen, please report: unknown option selected: {name!r}"
+            )
+        return selection
+
+    def __run_fzf(self, *extra_args: str) -> tuple[int, str]:
+        "returns exit code & output of fzf, raises on unexpected exit codes"
+        STATUS.emit("menu", menu=self.design.border_label)
+        server = PreviewServer(self.options)
+        with server.listen() as cmd:
             fzf_args = [
                 "/usr/bin/env",
                 "fzf",
                 "--layout=reverse",
                 "--tiebreak=index",
-                "--border=rounded",
-                "--margin=1",
-                "--padding=1",
                 "--no-info",
                 f"--preview={cmd}",
             ]
             fzf_args.extend(self.design.fzf_args)
+            fzf_args.extend(extra_args)
             proc = subprocess.Popen(
                 fzf_args,
                 stdin=subprocess.PIPE,
@@ -995,52 +3360,71 @@ class MenuSelection:
                 text=True,
             )
             stdout, _ = proc.communicate("\n".join(self.options.keys()) + "\n")
-        if proc.returncode in {1, 130}:
-            return None
-        elif proc.returncode != 0:
+        if CONFIG.debugMode:
+            print(f"[DEBUG] previews: {server.stats.line}")
+        if proc.returncode not in {0, 1, 130}:
             raise subprocess.CalledProcessError(
                 proc.returncode,
                 fzf_args,
                 stdout,
             )
-        name = stdout.rstrip("\r\n")
-        selection = self.options.get(name)
-        if selection is None:
-            raise RuntimeError(
-                f"should not happen, please report: unknown option selected: {name!r}"
-            )
-        return selection
+        return proc.returncode, stdout
 
     @staticmethod
-    def render_preview(address: str, name: str) -> NoReturn:
+    def render_preview(address: str, name: str, delay: float = 0) -> NoReturn:
         """handler for --preview-call, taking its arguments"""
+        # fzf terminates outdated preview commands,
+        # so delaying skips previews of options the user just scrolls past
+        time.sleep(delay)
         conn = Client(family="AF_UNIX", address=address)
-        conn.send(name)
-        option = cast(MenuOption | None, conn.recv())
+        # size of preview window as given by fzf, so only what fits is transferred
+        conn.send((name, env_int("FZF_PREVIEW_LINES"), env_int("FZF_PREVIEW_COLUMNS")))
+        preview = cast(str | None, conn.recv())
         conn.close()
-        if option is None:
+        if preview is None:
             print(
                 f"should not happen, please report:\nno preview available for\n{name!r}"
             )
             sys.exit(1)
-        # TODO adapt preview text to size of preview window (given via environment variables)
-        option.output_preview()
+        print(preview)
+        sys.exit(0)
+
+
+class PreviewServer:
+    """answers the preview commands of fzf concurrently
+
+    fzf terminates outdated preview commands,
+    so requests superseded by a newer one are dropped instead of rendered
+    """
+
+    JOBS = 4
+    "previews rendered in parallel"
+
+    def __init__(self, options: Mapping[str, MenuOption]) -> None:
+        self.options = options
+        self.stats = PreviewStats()
+        self.__latest = 0
+        "number of the latest request"
 
     @contextmanager
-    def __preview_listener(self) -> Iterator[str]:
+    def listen(self) -> Iterator[str]:
+        "yields the preview command for fzf"
         exit_code = random.randbytes(32)
         listener = Listener(family="AF_UNIX")
         thread = Thread(
-            target=self.__provide_listener,
+            target=self.__serve,
             args=(listener, exit_code),
             daemon=True,
         )
         thread.start()
         try:
+            preview_delay = LOW_BANDWIDTH_PREVIEW_DELAY if CONFIG.low_bandwidth else 0
             yield shlex.join(
                 (
                     sys.executable,
                     sys.argv[0],
+                    "--preview-delay",
+                    str(preview_delay),
                     "--preview-call",
                     cast(str, listener.address),  # because family="AF_UNIX"
                 )
@@ -1055,17 +3439,97 @@ class MenuSelection:
             conn.close()
             thread.join()
 
-    def __provide_listener(self, listener: Listener, exit_code: bytes) -> None:
+    def __serve(self, listener: Listener, exit_code: bytes) -> None:
+        pool = ThreadPoolExecutor(
+            max_workers=self.JOBS, thread_name_prefix=f"{APP_NAME}-preview"
+        )
+        queued: list[tuple[Future[None], Connection, float]] = []
+        "requests possibly not answered yet, with their time of acceptance"
         while True:
             conn = listener.accept()
-            name = conn.recv()
-            if name == exit_code:
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                conn.close()  # preview command terminated by fzf before sending
+                continue
+            if request == exit_code:
+                pool.shutdown(wait=False, cancel_futures=True)
+                for future, queued_conn, accepted_at in queued:
+                    if future.cancelled():  # so never answered by __answer
+                        queued_conn.close()
+                        self.stats.answered(time.monotonic() - accepted_at, True)
                 conn.send(exit_code)
                 conn.close()
                 listener.close()
                 return
-            conn.send(self.options.get(name))
+            self.__latest += 1
+            self.stats.accepted()
+            accepted_at = time.monotonic()
+            future = pool.submit(
+                self.__answer, conn, request, self.__latest, accepted_at
+            )
+            queued = [q for q in queued if not q[0].done()]
+            queued.append((future, conn, accepted_at))
+
+    def __answer(
+        self,
+        conn: Connection,
+        request: tuple[str, int | None, int | None],
+        number: int,
+        accepted_at: float,
+    ) -> None:
+        dropped = True
+        try:
+            if number != self.__latest:
+                conn.send("")  # fzf already requested another preview
+                return
+            name, lines, columns = request
+            option = self.options.get(name)
+            try:
+                preview = None if option is None else option.preview(lines, columns)
+            except Exception as e:
+                preview = f"preview failed: {e!r}"
+            dropped = number != self.__latest  # may have changed while rendering
+            conn.send(preview)
+        except OSError:
+            pass  # preview command already terminated by fzf
+        finally:
             conn.close()
+            self.stats.answered(time.monotonic() - accepted_at, dropped)
+
+
+@dataclass
+class PreviewStats:
+    "for debugging the responsiveness of previews"
+
+    answered_count: int = 0
+    dropped_count: int = 0
+    in_flight: int = 0
+    "amount of requests accepted but not answered yet"
+    max_in_flight: int = 0
+    total_latency: float = 0
+    "in seconds, from accepting to answering requests"
+    max_latency: float = 0
+    "in seconds"
+    lock: Lock = field(default_factory=Lock, repr=False)
+
+    def accepted(self) -> None:
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def answered(self, latency: float, dropped: bool) -> None:
+        with self.lock:
+            self.in_flight -= 1
+            self.answered_count += 1
+            self.dropped_count += dropped
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    @property
+    def line(self) -> str:
+        average = self.total_latency / max(self.answered_count, 1)
+        return f"{self.answered_count} answered, {self.dropped_count} dropped, max queue depth {self.max_in_flight}, latency avg {average * 1000:.0f} ms & max {self.max_latency * 1000:.0f} ms"
 
 
 @dataclass(
@@ -1078,20 +3542,53 @@ class MenuDesign:
 
     @property
     def fzf_args(self) -> Sequence[str]:
-        return tuple(
-            f"{key}={val}" for key, val in self.__fzf_args().items() if val is not None
+        return (
+            *self.__fzf_style_args(),
+            *(
+                f"{key}={val}"
+                for key, val in self.__fzf_args().items()
+                if val is not None
+            ),
         )
 
     def __fzf_args(self) -> Mapping[str, str | None]:
         border_label = self.border_label
         if CONFIG.debugMode:
             border_label = f"[DEBUG] {border_label} [DEBUG]"
+        if CONFIG.low_bandwidth:
+            # no border to show the label on
+            header_lines = (
+                border_label,
+                self.header,
+                "(press CTRL+/ to toggle preview)",
+            )
+            return {
+                "--header": "\n".join(line for line in header_lines if line),
+                "--prompt": self.prompt,
+            }
         return {
             "--border-label": border_label,
             "--header": self.header,
             "--prompt": self.prompt,
         }
 
+    def __fzf_style_args(self) -> Sequence[str]:
+        if CONFIG.low_bandwidth:
+            # minimize redraws & escape sequences, preview only on demand
+            return (
+                "--color=bw",
+                "--no-scrollbar",
+                "--no-separator",
+                "--preview-window=hidden",
+                # not ?, as that is part of URLs typed e.g. in flake_input
+                "--bind=ctrl-/:toggle-preview",
+            )
+        return (
+            "--border=rounded",
+            "--margin=1",
+            "--padding=1",
+        )
+
 
 class MenuOption(Protocol):
 
@@ -1101,7 +3598,9 @@ class MenuOption(Protocol):
     @property
     def name(self) -> str: ...
 
-    def output_preview(self) -> NoReturn: ...
+    def preview(self, lines: int | None, columns: int | None) -> str:
+        "fitted to the given size of the preview window, if known"
+        ...
 
 
 @dataclass(
@@ -1110,25 +3609,98 @@ class MenuOption(Protocol):
 class SimpleMenuOption:
     tag: str
     name: str
-    description: str
+    description: str | Sequence[str]
+    "sequence = sections, each shortened separately to fit the preview window"
+
+    def preview(self, lines: int | None, columns: int | None) -> str:
+        return fit_preview(self.description, lines, columns)
+
+
+@dataclass(
+    frozen=True,
+)
+class LazyMenuOption:
+    "generates its description on request, e.g. to include results of background tasks"
+
+    tag: str
+    name: str
+    generate_description: Callable[[], str | Sequence[str]]
+
+    def preview(self, lines: int | None, columns: int | None) -> str:
+        return fit_preview(self.generate_description(), lines, columns)
 
-    def output_preview(self) -> NoReturn:
-        print(self.description)
-        sys.exit(0)
+
+def fit_preview(
+    description: str | Sequence[str],
+    lines: int | None,
+    columns: int | None,
+) -> str:
+    sections = [description] if isinstance(description, str) else list(description)
+    sections_lines = [section.rstrip("\r\n").splitlines() for section in sections]
+    if columns is not None:
+        sections_lines = [
+            [shorten_line(line, columns) for line in section]
+            for section in sections_lines
+        ]
+    if lines is not None:
+        separators = len(sections_lines) - 1  # empty line between sections
+        budgets = distribute_lines(
+            lines - separators, [len(section) for section in sections_lines]
+        )
+        sections_lines = [
+            shorten_lines(section, budget)
+            for section, budget in zip(sections_lines, budgets)
+        ]
+    return "\n\n".join("\n".join(section) for section in sections_lines)
+
+
+def distribute_lines(total: int, demands: Sequence[int]) -> list[int]:
+    "shares total fairly, so small demands are satisfied & large ones are shortened"
+    budgets = [0] * len(demands)
+    remaining = max(total, 0)
+    pending = sorted(range(len(demands)), key=lambda i: demands[i])
+    while pending:
+        share = remaining // len(pending)
+        i = pending.pop(0)
+        budgets[i] = min(demands[i], share)
+        remaining -= budgets[i]
+    return budgets
+
+
+def shorten_lines(lines: list[str], budget: int) -> list[str]:
+    if len(lines) <= budget:
+        return lines
+    if budget <= 0:
+        return []
+    return lines[: budget - 1] + [f"… ({len(lines) - budget + 1} more lines)"]
+
+
+def shorten_line(line: str, columns: int) -> str:
+    line = line.expandtabs()
+    if len(line) <= columns:
+        return line
+    return line[: max(columns - 1, 0)] + "…"
 
 
 def generate_flake_option(flake: ListedFlake) -> SimpleMenuOption:
     desc = f"select host configuration from flake:\n{flake.reference}"
     if flake.is_offline:
         desc += "\n\nfollowing configs are available offline:"
-        desc += "\n- " + "\n- ".join(fqdn_sorted(flake.offline_hosts_available))
+        desc += "\n- " + "\n- ".join(flake.offline_hosts_available)
         online_only_hosts = flake.online_only_hosts
         if online_only_hosts:
             desc += "\n\nfollowing configs probably require network connectivity:"
-            desc += "\n- " + "\n- ".join(fqdn_sorted(online_only_hosts))
+            desc += "\n- " + "\n- ".join(online_only_hosts)
     else:
-        desc += "\n\nrequires network connectivity"
         # do not lookup hosts list, as that requires network connectivity
+        desc += "\n\nrequires network connectivity:\n"
+        desc += NETWORK.preview(Endpoint.of_flake(flake.reference))
+        if NETWORK.problem(flake.reference) is not None:
+            return SimpleMenuOption(
+                f"flake:{flake.str_key}",
+                f"from {flake.title} (unreachable)",
+                desc,
+            )
     return SimpleMenuOption(
         f"flake:{flake.str_key}",
         f"from {flake.title}",
@@ -0,0 +1,42 @@
+# used by ../setup.py to build the artifacts of an installation
+# with the disks selected by the user applied to the selected configuration
+# (similar to what disko-install does internally)
+# WARN: this file is not allowed to reference other files with path expressions
+#       due to its usage by ../setup.py
+{
+  flake,
+  host,
+  diskMappings ? "{}", # JSON: disko disk name -> device path
+  writeEfiBootEntries ? false,
+  rootMountPoint ? "/mnt",
+}:
+let
+  inherit (builtins) fromJSON getFlake mapAttrs;
+  originalSystem = (getFlake flake).nixosConfigurations.${host};
+  installSystem = originalSystem.extendModules {
+    modules = [
+      (
+        { lib, ... }:
+        {
+          boot.loader.efi.canTouchEfiVariables = lib.mkVMOverride writeEfiBootEntries;
+          disko = {
+            inherit rootMountPoint;
+            devices.disk = mapAttrs (_: device: {
+              # the disks selected by the user win over the ones of the config
+              device = lib.mkVMOverride device;
+            }) (fromJSON diskMappings);
+          };
+        }
+      )
+    ];
+  };
+in
+{
+  inherit (installSystem.config.system.build)
+    toplevel
+    # disko scripts
+    diskoScript
+    formatScript
+    mountScript
+    ;
+}
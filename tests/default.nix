@@ -6,5 +6,6 @@
     ./descriptionFallback.nix
     ./installDefault.nix
     ./offlineBuilds.nix
+    ./serveStore.nix
   ];
 }
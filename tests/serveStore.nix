@@ -0,0 +1,70 @@
+# type: flake-parts module
+# test whether an installer can serve its store as binary cache to other installers
+{
+  self,
+  ...
+}@top:
+{
+
+  perSystem =
+    { pkgs, ... }@systemArg:
+    {
+      checks.serveStore = pkgs.testers.nixosTest {
+        name = "serveStore";
+
+        nodes.node.imports = [
+          # configure installer
+          self.nixosModules.default
+          {
+            programs.disko-install-menu = {
+              enable = true;
+              autoStart = true;
+              options = {
+                defaultFlake = "${self}";
+                defaultHost = "test-descriptionFallback";
+                # local stand-in for another installer
+                extraSubstituters = [ "http://localhost:5000" ];
+              };
+              serveStore = {
+                enable = true;
+                secretKeyFile = "/run/test-cache.sec"; # generated by testScript
+              };
+            };
+          }
+          # for test environment only
+          {
+            system.extraDependencies = [ pkgs.hello ]; # path to be served
+          }
+        ];
+        interactive.nodes.node.programs.disko-install-menu.debugMode = true;
+
+        testScript = ''
+          import time
+          def send_chars(*args):
+            node.send_chars(*args)
+            time.sleep(1)
+          def wait_for_text(regexp, timeout):
+            return node.wait_until_tty_matches(1, regexp, timeout=timeout)
+
+          node.start()
+          node.wait_for_unit("default.target")
+          node.wait_for_unit("disko-install-menu.service")
+          node.succeed("nix-store --generate-binary-cache-key test-cache /run/test-cache.sec /run/test-cache.pub")
+          node.succeed("grep -q 'localhost:5000' /etc/disko-install-menu/config")
+          # cache only served on demand
+          node.fail("systemctl is-active nix-serve.service")
+          # main screen
+          wait_for_text("serve store to peers", timeout=2*60)
+          send_chars("serve store\n")
+          wait_for_text("serving Nix store as binary cache", timeout=60)
+          node.wait_for_open_port(5000)
+          node.succeed("nix --extra-experimental-features nix-command path-info --store http://localhost:5000 ${pkgs.hello}")
+          # stop serving
+          send_chars("\n")
+          wait_for_text("serve store to peers", timeout=60)
+          node.wait_until_fails("systemctl is-active nix-serve.service")
+        '';
+      };
+    };
+
+}